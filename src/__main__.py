@@ -1,27 +1,44 @@
-from PyQt5.QtCore import QThreadPool
-
-from src.gui import app
+import argparse
+import os
 import sys
 
 from src.optimization.kdtree import KDTreeOptimizer
-from src.optimization.space import functions
+from src.optimization.space import registry
+from src.optimization.trace import TraceLog
 
 
 def startGUI():
+    # GUI is imported only when needed so batch runs don't load Qt and OpenGL
+    from PyQt5.QtCore import QThreadPool
+    from src.gui import app
+
     pool = QThreadPool.globalInstance()
     pool.setMaxThreadCount(pool.maxThreadCount())
     app.start(sys.argv)
 
-def startTUI():
-    funcs = functions()
-    fun = funcs[10]
-    opt = KDTreeOptimizer(fun, fun.bounds, maxGeneration=10, maxIterations=30000)
+def startTUI(checkpointPath=None, checkpointEvery=1000, tracePath=None):
+    # Function that is 11th hardest in registry
+    info = sorted(registry(), key=lambda info: info.hardness, reverse=True)[10]
+    fun = info.load()
+    resume = checkpointPath is not None and os.path.exists(checkpointPath)
+    if resume:
+        opt = KDTreeOptimizer.load(checkpointPath, fun)
+    else:
+        opt = KDTreeOptimizer(fun, fun.bounds, maxGeneration=10, maxIterations=30000)
+    if tracePath is not None:
+        if resume and os.path.exists(tracePath):
+            # Evaluations after checkpoint are evaluated again, so they are cut from trace
+            fun.setTrace(TraceLog.open(tracePath, maxSeq=fun.evaluation))
+        else:
+            fun.setTrace(TraceLog(tracePath, len(fun.bounds)))
 
     print(fun)
     minVector = None
     minIter = None
     while fun.evaluation < opt.maxIterations:
         vector = opt.nextPoint()
+        if checkpointPath is not None and fun.evaluation % checkpointEvery == 0:
+            opt.save(checkpointPath)
         if minVector is None or minVector[-1] > vector[-1]:
             minVector= vector
             minIter = fun.evaluation
@@ -33,7 +50,15 @@ def startTUI():
 
     print(f"\nGLOO VECTOR: {fun.minVectors} {fun.minValue}")
     print(f"\nBEST VECTOR[{minIter}]: {minVector[:-1]} {minVector[-1]}")
+    if fun.trace is not None:
+        fun.trace.close()
 
 if __name__ == '__main__':
-    startTUI()
+    parser = argparse.ArgumentParser(description='Runs KD tree optimizer on one of the hardest registry functions')
+    parser.add_argument('--checkpoint', help='Checkpoint file, run is resumed from it if it exists')
+    parser.add_argument('--checkpoint-every', type=int, default=1000, help='Number of evaluations between checkpoints')
+    parser.add_argument('--trace', help='Trace file of all evaluations, it is appended to when run is resumed')
+    args = parser.parse_args()
+
+    startTUI(checkpointPath=args.checkpoint, checkpointEvery=args.checkpoint_every, tracePath=args.trace)
     # startGUI()
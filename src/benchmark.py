@@ -0,0 +1,165 @@
+import argparse
+import csv
+import inspect
+import sys
+import time
+from multiprocessing import Pool
+from typing import List, Dict
+
+from src.optimization import rng as rngs
+from src.optimization.kdtree import KDTreeOptimizer
+from src.optimization.space import registry, Function, CACHE_DIR
+from src.optimization.test import TestOptimizer
+from src.optimization.triangle import TriangleOptimizer
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Functions with more dimensions are splited by KD tree only on longest axis, splitting all axes gives 2^d cubes at once
+KD_SPLIT_ALL_DIMENSIONS = 6
+# Default max generation of KD tree splits every axis this many times
+KD_AXIS_DEPTH = inspect.signature(KDTreeOptimizer).parameters['maxGeneration'].default
+
+
+def kdTreeOptimizer(fun: Function, maxEval) -> KDTreeOptimizer:
+    dimensions = len(fun.bounds)
+    if dimensions <= KD_SPLIT_ALL_DIMENSIONS:
+        return KDTreeOptimizer(fun, fun.bounds, maxIterations=maxEval)
+    # Every generation refines only one axis, so reaching the default depth of every axis needs depth * d generations
+    return KDTreeOptimizer(fun, fun.bounds, maxIterations=maxEval, splitAxes=1, maxGeneration=KD_AXIS_DEPTH * dimensions)
+
+
+# Optimizer name -> (factory, supports only 2D functions, uses random generator)
+OPTIMIZERS = {
+    'KDTreeOptimizer': (lambda fun, maxEval, rng: kdTreeOptimizer(fun, maxEval), False, False),
+    'TriangleOptimizer': (lambda fun, maxEval, rng: TriangleOptimizer(fun, maxEval, rng=rng), True, True),
+    'TestOptimizer': (lambda fun, maxEval, rng: TestOptimizer(fun, rng=rng), True, True),
+}
+
+COLUMNS = ['optimizer', 'function', 'dimensions', 'seed', 'maxEval', 'evaluations', 'evaluationsToTolerance',
+           'bestValue', 'fglob', 'finalError', 'wallTime', 'peakRssGrowthKb', 'status']
+
+
+class Progress:
+    """Follows best value of every counted evaluation, it is listener of function"""
+
+    def __init__(self, fglob, tolerance):
+        self.fglob = fglob
+        self.tolerance = tolerance
+        self.bestValue = None
+        self.evaluationsToTolerance = None
+
+    def __call__(self, seq, value):
+        if self.bestValue is None or value < self.bestValue:
+            self.bestValue = float(value)
+            if self.evaluationsToTolerance is None and self.bestValue - self.fglob <= self.tolerance:
+                self.evaluationsToTolerance = int(seq)
+
+
+def peakRssKb():
+    """Returns peak resident set size of process in kilobytes, None where resource is missing"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def jobs(optimizers: List[str], functions: List[str] = None, seeds=3, seed=0, maxEval=1000, tolerance=1e-4, shift=False,
+         timeout=None, cacheDir=CACHE_DIR) -> List[Dict]:
+    """Returns runs of all optimizers on all functions they support for every seed.
+
+    Optimizer without random generator gives same run for every seed, so it runs only once if bounds are not shifted.
+    """
+    infos = [info for info in registry(cacheDir) if functions is None or info.name in functions]
+    return [
+        {'optimizer': optimizer, 'function': info.name, 'seedIndex': i, 'seed': seed, 'seeds': seeds,
+         'maxEval': maxEval, 'tolerance': tolerance, 'shift': shift, 'timeout': timeout, 'cacheDir': cacheDir}
+        for optimizer in optimizers
+        for info in infos
+        if len(info.bounds) == 2 or not OPTIMIZERS[optimizer][1]
+        for i in range(seeds if shift or OPTIMIZERS[optimizer][2] else 1)
+    ]
+
+
+def runJob(job: Dict) -> Dict:
+    """Runs one optimizer on one function until evaluation budget or time is spent, errors are reported in status"""
+    # Forked process starts with high-water mark of its parent, so only growth of peak during the job is reported
+    startRss = peakRssKb()
+
+    # Same seed index gives same function shift to all optimizers
+    functionRng, optimizerRng = rngs.spawn(rngs.spawn(job['seed'], job['seeds'])[job['seedIndex']], 2)
+    info = next(info for info in registry(job['cacheDir']) if info.name == job['function'])
+    fun: Function = info.load(rand=job['shift'], rng=functionRng)
+    progress = Progress(fun.minValue, job['tolerance'])
+    fun.setListener(progress)
+
+    status = 'ok'
+    start = time.perf_counter()
+    try:
+        factory = OPTIMIZERS[job['optimizer']][0]
+        optimizer = factory(fun, job['maxEval'], optimizerRng)
+        while fun.evaluation < job['maxEval']:
+            # Time is checked between evaluations, so job runs at most one evaluation longer than timeout
+            if job['timeout'] is not None and time.perf_counter() - start > job['timeout']:
+                status = 'timeout'
+                break
+            optimizer.nextPoint()
+    except Exception as e:
+        status = f'{type(e).__name__}: {e}'
+    wallTime = time.perf_counter() - start
+
+    return {
+        'optimizer': job['optimizer'],
+        'function': job['function'],
+        'dimensions': len(fun.bounds),
+        'seed': job['seedIndex'],
+        'maxEval': job['maxEval'],
+        'evaluations': fun.evaluation,
+        'evaluationsToTolerance': progress.evaluationsToTolerance,
+        'bestValue': progress.bestValue,
+        'fglob': float(fun.minValue),
+        'finalError': None if progress.bestValue is None else progress.bestValue - float(fun.minValue),
+        'wallTime': wallTime,
+        'peakRssGrowthKb': None if startRss is None else peakRssKb() - startRss,
+        'status': status,
+    }
+
+
+def run(jobs: List[Dict], output, workers=None):
+    """Runs jobs in process pool and writes row of every job to output csv file in order of jobs"""
+    writer = csv.DictWriter(output, COLUMNS)
+    writer.writeheader()
+    with Pool(workers, maxtasksperchild=1) as pool:
+        for row in pool.imap(runJob, jobs):
+            writer.writerow(row)
+            output.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Runs optimizers on benchmark functions and writes results to csv')
+    parser.add_argument('-o', '--output', help='Csv file, results are written to stdout if it is not given')
+    parser.add_argument('--optimizers', nargs='+', choices=list(OPTIMIZERS), default=list(OPTIMIZERS))
+    parser.add_argument('--functions', nargs='+', help='Names of functions, all functions are used by default')
+    parser.add_argument('--seeds', type=int, default=3, help='Number of runs of every optimizer on every function')
+    parser.add_argument('--seed', type=int, default=0, help='Master seed, seeds of runs are spawned from it')
+    parser.add_argument('--maxEval', type=int, default=1000)
+    parser.add_argument('--tolerance', type=float, default=1e-4, help='Error to fglob that counts as solved')
+    parser.add_argument('--shift', action='store_true', help='Randomly shift lower bounds of functions')
+    parser.add_argument('--timeout', type=float, help='Seconds after which job stops with timeout status')
+    parser.add_argument('--workers', type=int, help='Number of processes, number of cpus by default')
+    args = parser.parse_args(argv)
+
+    matrix = jobs(args.optimizers, args.functions, args.seeds, args.seed, args.maxEval, args.tolerance, args.shift,
+                  args.timeout)
+    if args.output is None:
+        run(matrix, sys.stdout, args.workers)
+    else:
+        with open(args.output, 'w', newline='') as f:
+            run(matrix, f, args.workers)
+
+
+if __name__ == '__main__':
+    main()
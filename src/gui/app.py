@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Dict
 
 import numpy as np
 from PyQt5 import QtWidgets, uic
@@ -11,12 +11,14 @@ from OpenGL.GL import GL_LINES
 from src import utils
 from src.gui.glsl import shader
 from src.gui.plot import Shape, Model
+from src.gui.plot.kdtree import KDTreeModels
 from src.gui.plot.model import FunctionModel, AxisModel, MODEL
 from src.gui.ui import config
 from src.gui.widgets import OpenGLWidget
 from src.gui.worker import Worker
 from src.optimization.kdtree import KDTreeOptimizer
-from src.optimization.space import functions, Function
+from src.optimization.space import registry, Function, FunctionInfo
+from src.optimization.surface import SurfaceCache
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -48,7 +50,10 @@ class MainWindow(QtWidgets.QMainWindow):
     def __init__(self):
         self.inited = False
         self.optimizer = None
+        self.optimizerModels = None
         self.iterationsLeft = None
+        self.functions: Dict[str, Function] = {}  # Functions loaded from registry by name
+        self.surfaceCache = SurfaceCache()
 
         super(MainWindow, self).__init__()  # Call the inherited classes __init__ method
         uic.loadUi(utils.getPath(__file__, 'ui/MainWindow.ui'), self)  # Load the .ui file
@@ -90,9 +95,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.lightCB.stateChanged.connect(self.on_light_toggle)
 
     def __initUI(self):
-        for f in functions():
-            if f.dimensions <= 2:
-                self.nameCB.addItem(f'{f.dimensions} {f.name:<30}{f.hardness:>.2f}', f)
+        # Functions are listed from registry metadata and created only when selected
+        for info in sorted(registry(), key=lambda info: info.hardness, reverse=True):
+            if info.dimensions <= 2:
+                self.nameCB.addItem(f'{info.dimensions} {info.name:<30}{info.hardness:>.2f}', info)
 
         for cmap in shader.colormaps():
             self.colormapCB.addItem(QIcon(cmap.preview), '', userData=cmap.id)
@@ -101,6 +107,14 @@ class MainWindow(QtWidgets.QMainWindow):
         self.findAction = QShortcut(QKeySequence(Qt.CTRL + Qt.Key_F), self)
         self.findAction.activated.connect(self.on_find_shortcut)
 
+    def currentFunction(self) -> Function:
+        info: FunctionInfo = self.nameCB.currentData()
+        if info is None:
+            return None
+        if info.name not in self.functions:
+            self.functions[info.name] = info.load()
+        return self.functions[info.name]
+
     def on_stop_toggle(self, state):
         if state == 2:
             self.nextPointTimer.stop()
@@ -159,7 +173,7 @@ class MainWindow(QtWidgets.QMainWindow):
             point.insert(1, 0)
 
         pointShape = Shape().add_point(point, [0, 0, 0, 1])
-        models = self.optimizer.models()
+        models = self.optimizerModels.models()
 
         for m in models:
             m.view = self.normalW.functionModel.view
@@ -195,11 +209,12 @@ class MainWindow(QtWidgets.QMainWindow):
             self.nextPointTimer.stop()
 
     def on_start(self):
-        self.fun: Function = self.nameCB.currentData()
+        self.fun: Function = self.currentFunction()
         self.fun.evaluation = 0
-        fun = self.nameCB.currentData()
-        self.optimizer = KDTreeOptimizer(fun, fun.bounds, maxIterations=self.iterationsSB.value())
-        for m in self.optimizer.models():
+        fun = self.currentFunction()
+        self.optimizerModels = KDTreeModels()
+        self.optimizer = KDTreeOptimizer(fun, fun.bounds, maxIterations=self.iterationsSB.value(), listeners=[self.optimizerModels.on_event])
+        for m in self.optimizerModels.models():
             m.initBuffers()
         self.iterationsLeft = self.iterationsSB.value()
         self.nextPointTimer.setInterval(self.iterationPauseSB.value())
@@ -220,8 +235,8 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def on_name_change(self):
         self.on_end()
-        fun = self.nameCB.currentData()
-        if fun and self.inited:
+        fun = self.currentFunction() if self.inited else None
+        if fun:
             self.loadFunction(fun)
 
     def on_colormap_change(self):
@@ -258,7 +273,8 @@ class MainWindow(QtWidgets.QMainWindow):
                 function=fun,
                 step=200,
                 zoom=zoom,
-                zoomCenter=firstMinVector
+                zoomCenter=firstMinVector,
+                cache=self.surfaceCache
             )
 
             bb = shape.boundBox
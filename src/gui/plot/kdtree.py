@@ -0,0 +1,36 @@
+from typing import List
+
+from OpenGL import GL
+
+from src.gui.plot import Model, Shape
+from src.gui.plot.model import MODEL
+from src.optimization.kdtree import Cube, Point, EVENT
+
+
+class KDTreeModels:
+    """Draws cubes from event stream of KDTreeOptimizer"""
+
+    def __init__(self):
+        self.grids = Model(MODEL.GENERIC, GL.GL_LINES, 2, initBuffers=False)
+        self.localMins = Model(MODEL.GENERIC, GL.GL_LINES, 3, initBuffers=False)
+
+    def models(self) -> List[Model]:
+        return [self.grids, self.localMins]
+
+    def on_event(self, event: EVENT, cube: Cube):
+        if event == EVENT.CREATE and cube.dim == 2:
+            self.drawGrid(cube)
+
+    def drawGrid(self, cube: Cube):
+        bounds = cube.bounds
+        shape = Shape()
+        shape.add_line(cube.start, [bounds[0][1], bounds[1][0]], [1, 0, 0, 1])
+        shape.add_line(cube.start, [bounds[0][0], bounds[1][1]], [1, 0, 0, 1])
+        shape.add_line([bounds[0][1], bounds[1][0]], cube.end, [1, 0, 0, 1])
+        shape.add_line([bounds[0][0], bounds[1][1]], cube.end, [1, 0, 0, 1])
+        self.grids.addShape(shape)
+
+    def drawLocalMin(self, point: Point):
+        shape = Shape()
+        shape.add_line(point.center + [-100], [point.center[0]+0.01, point.center[1]+0.01] + [100],[1, 0, 0, 1])
+        self.localMins.addShape(shape)
@@ -6,7 +6,9 @@ import numpy as np
 import pygmsh
 
 from src import utils
+from src.optimization import surface
 from src.optimization.space import Function
+from src.optimization.surface import SurfaceCache
 
 
 class BoundBox:
@@ -196,64 +198,35 @@ class Shape:
         mesh = meshio.read(utils.getPath(__file__, '../../../data/models/dragon_vrip_res2.ply'))
         return self.__addMesh(mesh.points, mesh.cells[0].data, color)
 
-    def add_function(self, function: Function, step, zoomCenter: List[float] = None, zoom=1):
-        args = (function, step, zoomCenter, zoom)
+    def add_function(self, function: Function, step, zoomCenter: List[float] = None, zoom=1, cache: SurfaceCache = None):
+        bounds = surface.zoomBounds(function, zoomCenter, zoom)
+        values = surface.sample(function, bounds, step) if cache is None else cache.sample(function, bounds, step)
+        args = (bounds, step, values)
         if function.dimensions == 1:
             return self.__add_function1D(*args)
         elif function.dimensions == 2:
             return self.__add_function2D(*args)
 
-    def __add_function1D(self, function: Function, step, zoomCenter, zoom):
-        bounds = function.bounds
-        if zoomCenter is not None and zoom != 1:
-            xRange = abs(bounds[0][0] - bounds[0][1]) / zoom
-            bounds = [
-                [max([bounds[0][0], zoomCenter[0] - xRange]), min([bounds[0][1], zoomCenter[0] + xRange])],
-            ]
+    def __add_function1D(self, bounds, step, values):
         axis_x = np.linspace(*bounds[0], step)
-        points = []
-
-        for xi in range(len(axis_x)):
-            x = axis_x[xi]
-            points.append([x, 0, function([x])])
+        points = [[x, 0, value] for x, value in zip(axis_x.tolist(), values.tolist())]
 
         for i in range(len(points) - 1):
             self.add_line(points[i], points[i + 1])
 
         return self
 
-    def __add_function2D(self, function: Function, step, zoomCenter, zoom):
-
-        bounds = function.bounds
-        if zoomCenter is not None and zoom != 1:
-            xRange = abs(bounds[0][0] - bounds[0][1]) / zoom
-            yRange = abs(bounds[1][0] - bounds[1][1]) / zoom
-            bounds = [
-                [max([bounds[0][0], zoomCenter[0] - xRange]), min([bounds[0][1], zoomCenter[0] + xRange])],
-                [max([bounds[1][0], zoomCenter[1] - yRange]), min([bounds[1][1], zoomCenter[1] + yRange])]
-            ]
-
+    def __add_function2D(self, bounds, step, values):
         axis_x = np.linspace(*bounds[0], step)
         axis_y = np.linspace(*bounds[1], step)
 
-        points = []
-        faces = []
-
-        sqC = 0  # Square count
-        for yi in range(len(axis_y)):
-            for xi in range(len(axis_x)):
-                y = axis_y[yi]
-                x = axis_x[xi]
-                points.append([x, y, function([x, y])])
-                upPoint = sqC + (len(axis_y))
-
-                if xi < len(axis_x) - 1 and yi < len(axis_y) - 1:
-                    faces += [
-                        [sqC, sqC + 1, upPoint],
-                        [sqC + 1, upPoint + 1, upPoint],
-                    ]
-                    sqC += 1
-                else:
-                    sqC += 1
+        # Rows of values go over y, so points are ordered by y and then by x
+        x, y = np.meshgrid(axis_x, axis_y)
+        points = np.column_stack([x.ravel(), y.ravel(), np.ravel(values)])
+
+        # Two triangles on every square of grid, square is given by its lower left point
+        squares = (np.arange(len(axis_y) - 1)[:, None] * len(axis_x) + np.arange(len(axis_x) - 1)).ravel()
+        upPoints = squares + len(axis_x)
+        faces = np.stack([squares, squares + 1, upPoints, squares + 1, upPoints + 1, upPoints], axis=1).reshape(-1, 3)
 
         return self.__addMesh(np.array(points, dtype=np.float32), np.array(faces, dtype=np.int32))
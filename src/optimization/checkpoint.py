@@ -0,0 +1,29 @@
+import json
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+
+def packLists(lists: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Packs ragged lists of ids to offsets and values arrays"""
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(l) for l in lists])
+    values = np.fromiter((id for l in lists for id in l), dtype=np.int64, count=offsets[-1])
+    return offsets, values
+
+
+def unpackLists(offsets: np.ndarray, values: np.ndarray) -> List[List[int]]:
+    offsets, values = offsets.tolist(), values.tolist()
+    return [values[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+def write(path, index: Dict, arrays: Dict[str, np.ndarray]):
+    """Writes arrays and json index of scalar state to uncompressed npz file"""
+    with open(path, 'wb') as f:
+        np.savez(f, index=np.array(json.dumps(index)), **arrays)
+
+
+def read(path) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    return json.loads(arrays.pop('index').item()), arrays
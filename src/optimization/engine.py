@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED, Future
+from multiprocessing import Queue
+from typing import Callable, Dict, List
+
+from src.optimization import rng as rngs
+from src.optimization.space import Function
+
+# Function of the worker process, it is send only once when process starts
+workerFunction: Function = None
+
+
+def initWorker(fun: Function, latencyRngs: Queue):
+    global workerFunction
+    workerFunction = fun
+    if fun.latency is not None:
+        # Every worker takes its own generator spawned from generator of latency, so delays of workers are independent
+        fun.latency.rng = latencyRngs.get()
+
+
+def evaluateInWorker(vector):
+    return workerFunction.evaluate(vector)
+
+
+class ProcessPoolEngine:
+    """Evaluates points of ask/tell optimizer in process pool until evaluation budget is spent.
+
+    Point whose evaluation failed is evaluated again, after max retries it is given failure value.
+    """
+
+    def __init__(self, fun: Function, optimizer, maxWorkers=None, maxEval=None, maxRetries=3, failureValue=float('inf')):
+        self.fun: Function = fun
+        self.optimizer = optimizer
+        self.maxWorkers = os.cpu_count() if maxWorkers is None else maxWorkers
+        self.maxEval = optimizer.maxIterations if maxEval is None else maxEval
+        self.maxRetries = maxRetries
+        self.failureValue = failureValue
+        self.failures = 0
+
+    def run(self, callback: Callable = None):
+        latencyRngs = Queue()
+        if self.fun.latency is not None:
+            for rng in rngs.spawn(self.fun.latency.rng, self.maxWorkers):
+                latencyRngs.put(rng)
+
+        with ProcessPoolExecutor(self.maxWorkers, initializer=initWorker, initargs=(self.fun, latencyRngs)) as pool:
+            futures: Dict[Future, object] = {}
+            retries: Dict[object, int] = {}  # Point -> number of failed evaluations
+            failedPoints: List[object] = []  # Points that are evaluated again before new points are asked
+            evaluated = self.fun.evaluation  # Sequence number of last told evaluation
+            while True:
+                # Keep all workers busy, evaluations are counted when points are dispatched
+                free = min(self.maxWorkers - len(futures), self.maxEval - self.fun.evaluation)
+                if free > 0:
+                    points = failedPoints[:free]
+                    del failedPoints[:free]
+                    for point in points + self.optimizer.ask(free - len(points)):
+                        self.fun.evaluation += 1
+                        futures[pool.submit(evaluateInWorker, point.center)] = point
+
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                points, values = [], []
+                for future in done:
+                    point = futures.pop(future)
+                    try:
+                        value = future.result()
+                    except Exception:
+                        self.failures += 1
+                        retries[point] = retries.get(point, 0) + 1
+                        if retries[point] <= self.maxRetries:
+                            # Failed evaluation is not counted, point takes its place in budget
+                            self.fun.evaluation -= 1
+                            failedPoints.append(point)
+                            continue
+                        value = self.failureValue
+                    retries.pop(point, None)
+                    points.append(point)
+                    values.append(value)
+
+                self.optimizer.tell(points, values)
+                for point, value in zip(points, values):
+                    evaluated += 1
+                    self.fun.phase = point.phase
+                    self.fun.record(point.center, value, seq=evaluated)
+
+                if callback is not None:
+                    for point in points:
+                        callback(point)
+
+        return self.optimizer.globalMin
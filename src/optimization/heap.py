@@ -0,0 +1,101 @@
+from array import array
+from typing import Tuple
+
+
+class IndexedHeap:
+    """Min heap of integer items with float keys, key of item that is allready in heap can be updated or removed in O(log n).
+
+    Items with equal keys are ordered by item. Heaps which never hold the same item at once can share positions array.
+    """
+
+    def __init__(self, positions: array = None):
+        self.keys = array('d')
+        self.items = array('i')
+        self.positions = array('i') if positions is None else positions  # Item -> position in heap, -1 if not in heap
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        if item >= len(self.positions):
+            return False
+        position = self.positions[item]
+        return 0 <= position < len(self.items) and self.items[position] == item
+
+    def key(self, item):
+        return self.keys[self.positions[item]]
+
+    def push(self, item, key):
+        positions = self.positions
+        if item >= len(positions):
+            positions.extend(array('i', [-1]) * (item + 1 - len(positions)))
+
+        if item in self:
+            position = positions[item]
+            self.keys[position] = key
+            self.__down(position)
+            self.__up(positions[item])
+        else:
+            self.items.append(item)
+            self.keys.append(key)
+            self.__up(len(self.items) - 1)
+
+    def remove(self, item):
+        if item not in self:
+            raise KeyError(item)
+        position = self.positions[item]
+        self.positions[item] = -1
+
+        # Last entry takes place of removed one
+        lastItem, lastKey = self.items.pop(), self.keys.pop()
+        if position < len(self.items):
+            self.items[position], self.keys[position] = lastItem, lastKey
+            self.__down(position)
+            self.__up(self.positions[lastItem])
+
+    def discard(self, item):
+        if item in self:
+            self.remove(item)
+
+    def peek(self) -> Tuple[int, float]:
+        return self.items[0], self.keys[0]
+
+    def pop(self) -> Tuple[int, float]:
+        item, key = self.peek()
+        self.remove(item)
+        return item, key
+
+    def __up(self, position):
+        keys, items, positions = self.keys, self.items, self.positions
+        key, item = keys[position], items[position]
+        while position > 0:
+            parent = (position - 1) >> 1
+            parentKey, parentItem = keys[parent], items[parent]
+            if parentKey < key or (parentKey == key and parentItem < item):
+                break
+            keys[position], items[position] = parentKey, parentItem
+            positions[parentItem] = position
+            position = parent
+        keys[position], items[position] = key, item
+        positions[item] = position
+
+    def __down(self, position):
+        keys, items, positions = self.keys, self.items, self.positions
+        size = len(items)
+        key, item = keys[position], items[position]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            childKey, childItem = keys[child], items[child]
+            if child + 1 < size:
+                rightKey, rightItem = keys[child + 1], items[child + 1]
+                if rightKey < childKey or (rightKey == childKey and rightItem < childItem):
+                    child, childKey, childItem = child + 1, rightKey, rightItem
+            if key < childKey or (key == childKey and item < childItem):
+                break
+            keys[position], items[position] = childKey, childItem
+            positions[childItem] = position
+            position = child
+        keys[position], items[position] = key, item
+        positions[item] = position
@@ -0,0 +1,61 @@
+import functools
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+
+class Instrument:
+    """Collects counters, gauges and exclusive timings of optimizer steps, every n-th step record is given to sink.
+
+    Without sink records are not emitted, cumulative state is still available with record, sink=print prints them.
+    Optimizers keep instrument as optional attribute and skip all instrumentation when it is None.
+    Timings are exclusive, time of nested timer is not counted in its parent.
+    """
+
+    def __init__(self, sink: Callable[[Dict], None] = None, every=1):
+        self.sink = sink
+        self.every = every
+        self.step = 0
+
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.timings: Dict[str, float] = {}
+        self.__timers: List[List] = []  # Stack of [name, start, time of nested timers]
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    @contextmanager
+    def time(self, name):
+        """Times block and counts how many times it was entered"""
+        self.count(name)
+        timer = [name, time.perf_counter(), 0.]
+        self.__timers.append(timer)
+        try:
+            yield
+        finally:
+            self.__timers.pop()
+            elapsed = time.perf_counter() - timer[1]
+            self.timings[name] = self.timings.get(name, 0.) + elapsed - timer[2]
+            if self.__timers:
+                self.__timers[-1][2] += elapsed
+
+    def timed(self, name, fun: Callable) -> Callable:
+        """Returns function wrapper that times every call of function"""
+        @functools.wraps(fun)
+        def wrapper(*args, **kwargs):
+            with self.time(name):
+                return fun(*args, **kwargs)
+        return wrapper
+
+    def record(self) -> Dict:
+        """Returns cumulative state of instrument"""
+        return {'step': self.step, 'counters': dict(self.counters), 'gauges': dict(self.gauges), 'timings': dict(self.timings)}
+
+    def endStep(self):
+        self.step += 1
+        if self.sink is not None and self.step % self.every == 0:
+            self.sink(self.record())
@@ -1,25 +1,67 @@
 from __future__ import annotations
 
-import copy
+from array import array
+from enum import Enum
 from statistics import mean
-from typing import List, Callable
+from typing import List, Callable, Dict, Set, Tuple
 
 import numpy as np
-from OpenGL import GL
 
-from src.gui.plot import Model, Shape
-from src.gui.plot.model import MODEL
+from src.optimization.heap import IndexedHeap
+from src.optimization import checkpoint
+from src.optimization.store import CubeStore
 
 # TODO: DO NOT MAKE A TREE THERE SHALL BE ONLY END CUBES WITH DOUBLE CONNECTED POINTS CONNECTIONS
 # TODO: SEARCH MIN CUBE FROM LIST OF CONNECTED CUBES TO A POINT!
 # TODO: THEN AFTER FIRST PASS DIVIDE CUBES
 
+# Search phases of optimizer, store keeps position of phase that created the cube
+PHASES = ['', 'init', 'local_min', 'most_connected', 'min_point']
+
+
 class Point:
-    def __init__(self, center, parentCube: Cube):
-        self.value = None
-        self.center = center
-        self.parentCube: Cube = parentCube
-        self.intersectingCubes = [parentCube]
+    """Central point of cube, it is a view of store row with id of its cube"""
+    __slots__ = ('store', 'id')
+
+    def __init__(self, store: CubeStore, id: int):
+        self.store: CubeStore = store
+        self.id: int = id
+
+    def __eq__(self, other):
+        return isinstance(other, Point) and other.store is self.store and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def invalidate(self):
+        # LOCAL MINIMUM TEST IS CACHED UNTIL CUBES AROUND THE POINT CHANGE
+        self.store.localMin[self.id] = -1
+
+    @property
+    def parentCube(self):
+        return Cube.fromStore(self.store, self.id)
+
+    @property
+    def intersectingCubes(self):
+        return [Cube.fromStore(self.store, id) for id in self.store.intersecting[self.id].tolist()]
+
+    @property
+    def center(self):
+        return self.store.center(self.id).tolist()
+
+    @property
+    def value(self):
+        value = self.store.value.item(self.id)
+        return None if value != value else value
+
+    @value.setter
+    def value(self, value):
+        self.store.value[self.id] = np.nan if value is None else value
+        self.parentCube.invalidateNeighbourhood()
+
+    @property
+    def phase(self):
+        return PHASES[self.store.phase[self.id]]
 
     @property
     def vector(self):
@@ -29,48 +71,106 @@ class Point:
 
     @property
     def generation(self):
-        return mean([cube.generation for cube in self.intersectingCubes])
+        return mean(self.store.generation[self.store.intersecting[self.id]].tolist())
 
     @property
     def closeCubes(self):
-        if len(self.intersectingCubes) == 1:  # Ce je pika v centru kvadrata, vrni povezane kvadrate z kvadratom.
+        if len(self.store.intersecting[self.id]) == 1:  # Ce je pika v centru kvadrata, vrni povezane kvadrate z kvadratom.
             return [self.parentCube] + self.parentCube.adjacentCubes  # V nasprotnem primeru ce je pika povezana z vec kvadrati vrni kvadrate povezane z piko.
         else:
             return self.intersectingCubes
 
     @property
     def closePoints(self):
-        points = []
+        points = {}
         for closeCube in self.closeCubes:
             for closePoint in closeCube.intersectingPoints:
-                if closePoint is not self and closePoint not in points:
-                    points.append(closePoint)
-        return points
+                if closePoint != self:
+                    points[closePoint] = None
+        return list(points)
 
     @property
     def isLocalMin(self):
-        for closeCube in self.closeCubes:
-            if closeCube.centralPoint.value < self.value:
-                return False
-        return True
+        store = self.store
+        if store.localMin[self.id] < 0:
+            cubes = store.intersecting[self.id]
+            closeCubes = store.adjacent[self.id] if len(cubes) == 1 else cubes
+            store.localMin[self.id] = not (store.value[closeCubes] < store.value[self.id]).any()
+        return bool(store.localMin[self.id])
 
 class Cube:
+    """Cell of the tree, it is a view of store row addressed by cube id"""
+    __slots__ = ('store', 'id')
 
     def __init__(self, bounds: List[List[float]]):
-        self.bounds = bounds
-        self.dim = len(bounds)
-        self.start = [b[0] for b in bounds]
-        self.end = [b[1] for b in bounds]
+        # CUBES FROM THE SAME TREE SHARE ONE STORE, NEW STORE HAS ONLY ROOT CUBE WITH ID 0
+        self.store: CubeStore = CubeStore(bounds)
+        self.id: int = 0
 
-        self.volume = None
-        self.generation = None
-        self.disconnected = False
+    @classmethod
+    def fromStore(cls, store: CubeStore, id: int):
+        cube = cls.__new__(cls)
+        cube.store = store
+        cube.id = id
+        return cube
+
+    def __eq__(self, other):
+        return isinstance(other, Cube) and other.store is self.store and other.id == self.id
 
-        self.centralPoint: Point = Point([], self)
-        self.parentsPoints: List[Point] = []
-        self.adjacentCubes: List[Cube] = []
+    def __hash__(self):
+        return hash(self.id)
 
-        self.__init()
+    @property
+    def dim(self):
+        return self.store.dim
+
+    @property
+    def bounds(self):
+        return self.store.bounds(self.id)
+
+    @property
+    def start(self):
+        return [bound[0] for bound in self.bounds]
+
+    @property
+    def end(self):
+        return [bound[1] for bound in self.bounds]
+
+    @property
+    def level(self):
+        return self.store.level[self.id].tolist()
+
+    @property
+    def index(self):
+        return self.store.index[self.id].tolist()
+
+    @property
+    def volume(self):
+        return float(np.prod(np.abs(self.store.cell(self.id))))
+
+    @property
+    def generation(self):
+        return self.store.generation.item(self.id)
+
+    @generation.setter
+    def generation(self, generation):
+        self.store.generation[self.id] = generation
+
+    @property
+    def disconnected(self):
+        return bool(self.store.children[self.id] >= 0)
+
+    @property
+    def centralPoint(self):
+        return Point(self.store, self.id)
+
+    @property
+    def parentsPoints(self):
+        return [Point(self.store, id) for id in self.store.parentsOf(self.id).tolist()]
+
+    @property
+    def adjacentCubes(self):
+        return [Cube.fromStore(self.store, id) for id in self.store.adjacent[self.id].tolist()]
 
     @property
     def meanValue(self):
@@ -83,137 +183,100 @@ class Cube:
     def intersectingPoints(self):
         return [self.centralPoint] + self.parentsPoints
 
-    def __init(self):
-        # INIT CENTER POINT
-        for bound in self.bounds:
-            self.centralPoint.center.append(mean(bound))
-
-        # INIT VOLUME
-        self.volume = 1
-        for axis in range(self.dim):
-            self.volume *= abs(self.bounds[axis][1] - self.bounds[axis][0])
-
-        if 2 == self.dim:
-            Models.drawGrid(self)
-
-    def divide(self, axis):
-        middleaxispoint = mean(self.bounds[axis])
-        loweraxisbound = [self.bounds[axis][0], middleaxispoint]
-        upperaxisbound = [middleaxispoint, self.bounds[axis][1]]
-        lowerbounds = copy.deepcopy(self.bounds)
-        upperbounds = copy.deepcopy(self.bounds)
-        lowerbounds[axis] = loweraxisbound
-        upperbounds[axis] = upperaxisbound
-
-        return [Cube(lowerbounds), Cube(upperbounds)]
-
-    def overlapsWith(self, cube):
-        smallCube, bigCube = (self, cube) if cube.volume > self.volume else (cube, self)
-
-        testingPoints = [smallCube.start, smallCube.end]
-        for axis, bound in enumerate(smallCube.bounds):
-            testingPoint = copy.copy(smallCube.start)
-            testingPoint[axis] = bound[1]
-            testingPoints.append(testingPoint)
-
-        for point in testingPoints:
-            inRange = True
-            for axis, bound in enumerate(bigCube.bounds):
-                if not (bound[0] <= point[axis] <= bound[1]):
-                    inRange = False
-                    break
-            if inRange:
-                return True
+    def invalidateNeighbourhood(self):
+        # POINTS WHICH CLOSE CUBES CAN CONTAIN THIS CUBE
+        store = self.store
+        store.localMin[self.id] = -1
+        store.localMin[store.parentsOf(self.id)] = -1
+        store.localMin[store.adjacent[self.id]] = -1
 
-        return False
+    def longestAxes(self, count) -> List[int]:
+        # LONGEST AXES RELATIVE TO ROOT CUBE HAVE LOWEST LATTICE LEVEL, TIES GO TO LOWER AXIS
+        level = self.level
+        return sorted(sorted(range(self.dim), key=lambda axis: (level[axis], axis))[:count])
 
     def contains(self, vector: List[float]):
-        for axis, bound in enumerate(self.bounds):
-            if not (bound[0] <= vector[axis] <= bound[1]):
-                return False
-        return True
+        bounds = np.array(self.bounds)
+        return bool(np.all(bounds[:, 0] <= vector) and np.all(vector <= bounds[:, 1]))
 
     def connectWithAdjacentCube(self, cube):
-        if cube not in self.adjacentCubes:
-            self.adjacentCubes.append(cube)
-        else:
+        adjacent = self.store.adjacent
+        if (adjacent[self.id] == cube.id).any():
             raise Exception("Cube is already in this cubes neighbours list, this should not happened!")
-
-        if self not in cube.adjacentCubes:
-            cube.adjacentCubes.append(self)
-        else:
+        if (adjacent[cube.id] == self.id).any():
             raise Exception("Self is already in cubes neighbours list, this should not happened!")
-
-    def connectWithParentPoint(self, point: Point):
-        if point not in self.parentsPoints:
-            self.parentsPoints.append(point)
-        else:
-            raise Exception("Point is already in this parents points list, this should not happened!")
-
-        if self not in point.intersectingCubes:
-            point.intersectingCubes.append(self)
-        else:
-            raise Exception("Self is already in point's intersecting cubes list, this should not happened!")
-
-    def partition(self):
-        partCubes = [self]
-        splitedCubes = []
-
-        # DIVIDE CUBE TO CHILDRENS
-        for axis in range(self.dim):
-            for partCube in partCubes:
-                splitedCubes += partCube.divide(axis)
-            partCubes = splitedCubes
-            splitedCubes = []
-
-        # CONNECT PARTITIONED CUBES WITH CURENT CUBES PARENTS POINT
-        # CREATE POINT FOR CURRENT PARITIONED CUBE
-        for partCube in partCubes:
-            partCube.generation = self.generation + 1
-            partCube.connectWithParentPoint(self.centralPoint)
-            for parentPoint in self.parentsPoints:
-                if partCube.contains(parentPoint.center):
-                    partCube.connectWithParentPoint(parentPoint)
-
-        # CONNECT PARTITIONED CUBES WITH THEM SELFS
-        for i in range(len(partCubes) - 1):
-            for j in range(i + 1, len(partCubes)):
-                partCubes[i].connectWithAdjacentCube(partCubes[j])
-
-        # CONNECT PARTITIONED CUBES WITH PARENT NEIGHBOURS
-        for partCube in partCubes:
-            for adjacentCube in self.adjacentCubes:
-                if adjacentCube.overlapsWith(partCube):
-                    partCube.connectWithAdjacentCube(adjacentCube)
-
-        # DISCONNECT FROM ALL ASSOCIATED POINTS AND CUBES
-        self.disconnect()
-
-        return partCubes
+        adjacent.append(self.id, cube.id)
+        adjacent.append(cube.id, self.id)
+
+        self.centralPoint.invalidate()
+        cube.centralPoint.invalidate()
+
+    def partition(self, axes: List[int] = None):
+        # DIVIDE CUBE TO CHILDRENS ALONG GIVEN AXES (ALL AXES IF NOT GIVEN)
+        # STORE CONNECTS PARTITIONED CUBES WITH CURENT CUBES PARENTS POINTS THAT ARE IN THEM
+        store = self.store
+        ids = store.partition(self.id, axes)
+
+        # SIBLINGS SHARE A FACE IF THEIR POSITIONS DIFFER IN ONE BIT
+        positions = np.arange(len(ids))
+        children = ids.start + positions
+        siblings = positions[:, None] ^ positions[None]
+        siblings = (siblings & (siblings - 1) == 0) & (siblings != 0)
+
+        # CUBES ACROSS FACES OF PARTITIONED CUBE ARE FOUND IN LATTICE INDEX, EACH OF THEM FACES CHILDREN ON ITS SIDE
+        neighbours = store.faceNeighbours(self.id)
+        facing = store.shareFace(neighbours, children)
+        for i, child in enumerate(ids):
+            store.adjacent.set(child, np.concatenate((children[siblings[i]], neighbours[facing[:, i]])))
+
+        # NEIGHBOURS ARE CONNECTED WITH CHILDREN IN PLACE OF PARTITIONED CUBE
+        self.invalidateNeighbourhood()
+        for neighbour, mask in zip(neighbours.tolist(), facing):
+            store.adjacent.replace(neighbour, self.id, children[mask])
+        store.adjacent.clear(self.id)
+
+        return [Cube.fromStore(store, id) for id in ids]
 
     def disconnect(self):
-        self.disconnected = True
+        self.invalidateNeighbourhood()
 
         # DISCONNECT NEIGHBOURS WITH FROM OLD CUBE THAT HAVE BEEN PARTITIONED
-        for adjacentCube in self.adjacentCubes:
-            adjacentCube.adjacentCubes.remove(self)
+        for adjacentId in self.store.adjacent[self.id].tolist():
+            self.store.adjacent.remove(adjacentId, self.id)
+        self.store.adjacent.clear(self.id)
+
+class EVENT(Enum):
+    CREATE = 0
+    SPLIT = 1
 
-        # DISCONNECT FROM ALL POINTS THAT ARE IN CUBE
-        for point in self.intersectingPoints:
-            point.intersectingCubes.remove(self)
 
 class KDTreeOptimizer:
-    def __init__(self, fun: Callable, bounds: List[List[float]],  maxGeneration=15, maxIterations=2000):
+    def __init__(self, fun: Callable, bounds: List[List[float]],  maxGeneration=15, maxIterations=2000, splitAxes=None,
+                 listeners: List[Callable[[EVENT, Cube], None]] = None):
         self.fun: Callable = fun
         self.bounds = bounds
 
-        self.cubes: List[Cube] = []
-        self.points: List[Point] = []
+        # Optional consumers (visualization) of created and splited cubes, optimizer itself doesn't draw anything
+        self.listeners: List[Callable[[EVENT, Cube], None]] = [] if listeners is None else listeners
+
+        # Number of longest axes that cube is splited on, all axes are splited if not given
+        self.splitAxes = splitAxes
 
-        self.partitioningQueue: List[Cube] = []
-        self.returningQueue: List[Point] = []
+        # ALL STATE OF CUBES AND POINTS IS IN STORE, QUEUES AND INDEXES HOLD THEIR IDS
+        self.store: CubeStore = None
 
-        self.globalMin = None
+        self.partitioningQueue: List[Tuple[int, str]] = []  # Cube and search phase that selected it
+        self.returningQueue: List[int] = []
+        self.pendingPoints: Dict[int, None] = {}  # Asked points that are waiting for evaluation
+
+        # INCREMENTAL CANDIDATES INDEXES
+        self.connectedCubes = IndexedHeap()  # End cube -> -adjacent cubes * 2**16 + generation
+        self.generationPoints: Dict[int, List[IndexedHeap]] = {}  # Min. generation -> [local min heap, other heap]
+        self.pointsHeap = array('i')  # Point -> 2 * min. generation + 1 if it is not local min, -1 if it is not in heap
+        self.pointsPositions = array('i')  # Positions of points in heaps, point is at most in one heap
+        self.dirtyPoints: Set[int] = set()
+
+        self.globalMinId = -1
         self.maxIterations = maxIterations
 
         self.currentMinGeneration = 0
@@ -226,123 +289,246 @@ class KDTreeOptimizer:
         cube = Cube(self.bounds)
         cube.generation = 0
 
-        self.cubes = [cube]
-        self.points = [cube.centralPoint]
+        self.store = cube.store
+        self.store.phase[cube.id] = PHASES.index('init')
+        self.partitioningQueue = [(cube.id, 'init')]
+        self.returningQueue = [cube.id]
+
+        self.reindex()
+        self.emit(EVENT.CREATE, cube)
+
+    @property
+    def cubes(self) -> List[Cube]:
+        """End cubes in order of creation"""
+        return [Cube.fromStore(self.store, id) for id in np.flatnonzero(self.store.children[:self.store.size] < 0).tolist()]
+
+    @property
+    def points(self) -> List[Point]:
+        return [Point(self.store, id) for id in range(self.store.size)]
+
+    @property
+    def globalMin(self):
+        return None if self.globalMinId < 0 else Point(self.store, self.globalMinId)
+
+    def reindex(self):
+        """Rebuilds incremental candidates indexes from end cubes and points"""
+        self.connectedCubes = IndexedHeap()
+        for cube in np.flatnonzero(self.store.children[:self.store.size] < 0).tolist():
+            self.connectedCubes.push(cube, self.__connectedKey(cube))
+
+        self.generationPoints = {}
+        self.pointsHeap = array('i', [-1]) * self.store.size
+        self.pointsPositions = array('i')
+        self.dirtyPoints = set(range(self.store.size))
+
+    def save(self, path):
+        """Writes state of optimizer to binary checkpoint, asked points that are pending are asked again after load"""
+        arrays = {'store_' + name: array for name, array in self.store.arrays().items()}
+        arrays['partitioning'] = np.array([cube for cube, _ in self.partitioningQueue], dtype=np.int64)
+        arrays['partitioning_phases'] = np.array([PHASES.index(phase) for _, phase in self.partitioningQueue], dtype=np.int8)
+        arrays['returning'] = np.array(list(self.pendingPoints) + self.returningQueue, dtype=np.int64)
+
+        checkpoint.write(path, {
+            'bounds': self.bounds,
+            'maxGeneration': self.maxGeneration,
+            'maxIterations': self.maxIterations,
+            'splitAxes': self.splitAxes,
+            'currentMinGeneration': self.currentMinGeneration,
+            'currentSearchGeneration': self.currentSearchGeneration,
+            'globalMin': self.globalMinId,
+            'evaluation': getattr(self.fun, 'evaluation', None),
+        }, arrays)
+
+    @classmethod
+    def load(cls, path, fun: Callable, listeners: List[Callable[[EVENT, Cube], None]] = None):
+        """Restores optimizer from checkpoint writen with save, listeners are not notified about restored cubes"""
+        index, arrays = checkpoint.read(path)
+        opt = cls(fun, index['bounds'], maxGeneration=index['maxGeneration'], maxIterations=index['maxIterations'],
+                  splitAxes=index['splitAxes'])
+
+        opt.store = CubeStore.fromArrays({name[len('store_'):]: array for name, array in arrays.items() if name.startswith('store_')})
+        opt.partitioningQueue = [(cube, PHASES[phase]) for cube, phase in zip(arrays['partitioning'].tolist(), arrays['partitioning_phases'].tolist())]
+        opt.returningQueue = arrays['returning'].tolist()
+        opt.globalMinId = index['globalMin']
+        opt.currentMinGeneration = index['currentMinGeneration']
+        opt.currentSearchGeneration = index['currentSearchGeneration']
+        opt.reindex()
+
+        if index['evaluation'] is not None:
+            fun.evaluation = index['evaluation']
+        opt.listeners = [] if listeners is None else listeners
+        return opt
+
+    def emit(self, event: EVENT, cube: Cube):
+        for listener in self.listeners:
+            listener(event, cube)
+
+    def __connectedKey(self, cube):
+        # Generation is below 2**16, so cubes with more adjacent cubes are always first
+        return -int(self.store.adjacent.count[cube]) * 2 ** 16 + int(self.store.generation[cube])
+
+    def __touchCubes(self, cubes: np.ndarray):
+        self.dirtyPoints.update(self.store.intersectingPoints(cubes).tolist())
+
+    def __updatePoints(self):
+        store = self.store
+        for point in self.dirtyPoints:
+            code = self.pointsHeap[point]
+            if code >= 0:
+                self.generationPoints[code >> 1][code & 1].remove(point)
+                self.pointsHeap[point] = -1
+
+            value = store.value.item(point)
+            cubes = store.intersecting[point]
+            if value != value or len(cubes) == 0:
+                continue
+
+            generation = int(store.generation[cubes].min())
+            if generation not in self.generationPoints:
+                self.generationPoints[generation] = [IndexedHeap(self.pointsPositions), IndexedHeap(self.pointsPositions)]
+            code = 2 * generation + (0 if Point(store, point).isLocalMin else 1)
+            self.generationPoints[generation][code & 1].push(point, value)
+            self.pointsHeap[point] = code
+
+        self.dirtyPoints.clear()
+
+    def __lowestPoint(self, isLocalMin, maxGeneration):
+        lowest = None
+        for generation, heaps in self.generationPoints.items():
+            heap = heaps[0 if isLocalMin else 1]
+            if generation <= maxGeneration and len(heap) > 0:
+                point, key = heap.peek()
+                if lowest is None or (key, point) < lowest:
+                    lowest = (key, point)
+        return -1 if lowest is None else lowest[1]
+
+    def __mostConnectedCubes(self, count):
+        # Pop most connected cubes, cubes that tie with last one on connections and generation are also poped
+        popped = []
+        while len(self.connectedCubes) > 0:
+            if len(popped) >= count and self.connectedCubes.peek()[1] != popped[-1][1]:
+                break
+            popped.append(self.connectedCubes.pop())
+        for cube, key in popped:
+            self.connectedCubes.push(cube, key)
 
-        self.partitioningQueue = [cube]
-        self.returningQueue = [cube.centralPoint]
+        # Ties are broken by the distance to global minimum
+        minVector = self.globalMin.vector
+        popped.sort(key=lambda ck: (ck[1], sum([(ele - minVector[i]) ** 2 for i, ele in enumerate(Point(self.store, ck[0]).vector)]), ck[0]))
+        return [cube for cube, _ in popped[:count]]
 
-    def lowestLocalMinCubeFromCurrentSearchGeneration(self):
+    def lowestLocalMinCubeFromCurrentSearchGeneration(self) -> List[Tuple[int, str]]:
+        """Returns cubes to partition with search phase that selected them, cube selected by more phases keeps the first"""
         # Search most connected cube
-        conCubes = sorted(self.cubes, key=lambda c: (len(c.adjacentCubes), -c.generation, -sum([(ele-self.globalMin.vector[i])**2 for i, ele in enumerate(c.centralPoint.vector)])), reverse=True)[:2**len(self.bounds)]
+        conCubes = self.__mostConnectedCubes(2**len(self.bounds) if self.splitAxes is None else 2**min(self.splitAxes, len(self.bounds)))
 
         # Search lowest local minimum from current generation
-        localMin = None
-        minPoint = None
-        while [localMin, minPoint].count(None) == 2:
-            for point in self.points:
-                for closeCube in point.intersectingCubes:
-                    if closeCube.generation <= self.currentSearchGeneration:
-                        if point.isLocalMin:
-                            if localMin is None or point.value < localMin.value:
-                                localMin = point
-                        else:
-                            if minPoint is None or point.value < minPoint.value:
-                                minPoint = point
-                        break
+        self.__updatePoints()
+        localMin = -1
+        minPoint = -1
+        while localMin < 0 and minPoint < 0:
+            localMin = self.__lowestPoint(isLocalMin=True, maxGeneration=self.currentSearchGeneration)
+            minPoint = self.__lowestPoint(isLocalMin=False, maxGeneration=self.currentSearchGeneration)
             self.currentSearchGeneration += 1
 
         # Reset current search generation
         if self.currentSearchGeneration >= self.maxGeneration:
             self.currentSearchGeneration = 0
 
-        cubes = []
-        if localMin is not None:
-            cubes += localMin.intersectingCubes
-        otherCubes = conCubes + [sorted(minPoint.intersectingCubes, key=lambda cube: cube.generation)[0]]
-        for oc in otherCubes:
-            if oc not in cubes:
-                cubes.append(oc)
-        return cubes
-
-    def nextPoint(self):
-        # EVALUATE POINT AND THEN RETURN POINTS FROM QUEUE IF EXISTS
-        if self.returningQueue:
-            point = self.returningQueue[0]
-            self.returningQueue.pop(0)
-            point.value = self.fun(point.center)
-            if self.globalMin is None or point.value < self.globalMin.value:
-                self.globalMin = point
-            return point.vector
-
-        if not self.partitioningQueue:
-            self.partitioningQueue += self.lowestLocalMinCubeFromCurrentSearchGeneration()
-
-        return self.partitionNextQueueCube()
-
-    def partitionNextQueueCube(self):
-
-        # GET CUBE FROM QUEUE CUBES LIST
-        while True:
+        candidates = []
+        if localMin >= 0:
+            candidates += [(cube, 'local_min') for cube in self.store.intersecting[localMin].tolist()]
+        candidates += [(cube, 'most_connected') for cube in conCubes]
+        if minPoint >= 0:
+            cubes = self.store.intersecting[minPoint]
+            candidates.append((int(cubes[np.argmin(self.store.generation[cubes])]), 'min_point'))
+
+        cubes: Dict[int, str] = {}
+        for cube, phase in candidates:
+            cubes.setdefault(cube, phase)
+        return list(cubes.items())
+
+    def ask(self, k=1) -> List[Point]:
+        """Returns up to k unevaluated points, their centers should be evaluated and results given back with tell.
+
+        Empty list is returned when all cubes reached max generation.
+        """
+        store = self.store
+        points = []
+        refilled = False
+        while len(points) < k:
+            # RETURN POINTS FROM QUEUE IF EXISTS
+            if self.returningQueue:
+                point = self.returningQueue.pop(0)
+                self.pendingPoints[point] = None
+                points.append(Point(store, point))
+                continue
+
+            # SEARCHING FOR NEW CUBES NEEDS VALUES OF ALL POINTS
             if not self.partitioningQueue:
+                if self.pendingPoints or points:
+                    break
+                # STOP IF LAST QUEUE HAD NO CUBE TO PARTITION AND ALL CUBES REACHED MAX GENERATION
+                endCubes = store.children[:store.size] < 0
+                if refilled and not np.any(store.generation[:store.size][endCubes] < self.maxGeneration):
+                    break
+                self.partitioningQueue += self.lowestLocalMinCubeFromCurrentSearchGeneration()
+                refilled = True
+
+            # GET CUBE FROM QUEUE CUBES LIST
+            cube, phase = self.partitioningQueue.pop(0)
+            if store.generation[cube] < self.maxGeneration:
+                self.partition(cube, phase)
+                refilled = False
+            elif not self.partitioningQueue:
                 self.currentSearchGeneration = 0
-                return self.nextPoint()
 
-            cube = self.partitioningQueue[0]
-            self.partitioningQueue.pop(0)
-            if cube.generation < self.maxGeneration:
-                break
+        return points
 
-        return self.partition(cube)
+    def tell(self, points: List[Point], values: List[float]):
+        store = self.store
+        for point, value in zip(points, values):
+            if point.id not in self.pendingPoints:
+                raise Exception("Point was not asked or it was allready evaluated!")
+            del self.pendingPoints[point.id]
 
-    def partition(self, cube: Cube):
-        children = cube.partition()
+            point.value = value
+            self.__touchCubes(np.concatenate(([point.id], store.adjacent[point.id], store.intersecting[point.id])))
+            if self.globalMinId < 0 or store.value[point.id] < store.value[self.globalMinId]:
+                self.globalMinId = point.id
 
-        # Remove CUBE FROM END CUBES AND ADD CUBE TO PARENT CUBES
-        self.cubes.remove(cube)
-        self.cubes += children
+    def nextPoint(self):
+        points = self.ask(1)
+        if not points:
+            raise Exception("All cubes reached max generation, there is no point to evaluate!")
+        point = points[0]
+        if hasattr(self.fun, 'phase'):
+            self.fun.phase = point.phase
+        self.tell([point], [self.fun(point.center)])
+        return point.vector
+
+    def partition(self, cube: int, phase='') -> List[Cube]:
+        store = self.store
+        adjacentCubes = store.adjacent[cube].copy()
+        self.__touchCubes(np.append(adjacentCubes, cube))
+        parentCube = Cube.fromStore(store, cube)
+        children = parentCube.partition(None if self.splitAxes is None else parentCube.longestAxes(self.splitAxes))
+        ids = np.arange(children[0].id, children[-1].id + 1)
+        store.phase[ids] = PHASES.index(phase)
+        self.pointsHeap.extend(array('i', [-1]) * len(ids))
+        self.__touchCubes(ids)
+
+        # UPDATE CONNECTIONS OF PARTITIONED CUBE AND ITS NEIGHBOURS
+        self.connectedCubes.remove(cube)
+        for updatedCube in ids.tolist() + adjacentCubes.tolist():
+            self.connectedCubes.push(updatedCube, self.__connectedKey(updatedCube))
 
         # ADD PARTITIONED CUBES CENTERS TO QUEUE
-        for child in children:
-            if child.centralPoint not in self.points:
-                self.points.append(child.centralPoint)
-            else:
-                raise Exception("Point is allready in list of all points!")
-
-            if child.centralPoint not in self.returningQueue:
-                self.returningQueue.append(child.centralPoint)
-            else:
-                raise Exception("Point is allready in queue list!")
-
-        # RETURN NEXT POINT
-        return self.nextPoint()
+        self.returningQueue += ids.tolist()
 
-    def models(self):
-        return [Models.grids, Models.localMins]
-
-class Models:
-    grids = Model(MODEL.GENERIC, GL.GL_LINES, 2, initBuffers=False)
-    localMins = Model(MODEL.GENERIC, GL.GL_LINES, 3, initBuffers=False)
-
-    @classmethod
-    def initGrid(cls, cubes: List[Cube]):
-        cls.grids.setShapes(cubes)
+        if self.listeners:
+            self.emit(EVENT.SPLIT, parentCube)
+            for child in children:
+                self.emit(EVENT.CREATE, child)
 
-    @classmethod
-    def initLocalMins(cls, points: List[Point]):
-        cls.localMins.setShapes(points)
-
-    @classmethod
-    def drawGrid(cls, cube: Cube):
-        shape = Shape()
-        shape.add_line(cube.start, [cube.bounds[0][1], cube.bounds[1][0]], [1, 0, 0, 1])
-        shape.add_line(cube.start, [cube.bounds[0][0], cube.bounds[1][1]], [1, 0, 0, 1])
-        shape.add_line([cube.bounds[0][1], cube.bounds[1][0]], cube.end, [1, 0, 0, 1])
-        shape.add_line([cube.bounds[0][0], cube.bounds[1][1]], cube.end, [1, 0, 0, 1])
-        cls.grids.addShape(shape)
-
-    @classmethod
-    def drawLocalMin(cls, point: Point):
-        shape = Shape()
-        shape.add_line(point.center + [-100], [point.center[0]+0.01, point.center[1]+0.01] + [100],[1, 0, 0, 1])
-        cls.localMins.addShape(shape)
+        return children
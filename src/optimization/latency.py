@@ -0,0 +1,77 @@
+import time
+from typing import Callable
+
+from src.optimization import rng as rngs
+
+
+class EvaluationFailure(RuntimeError):
+    """Injected failure of objective evaluation"""
+
+
+class EvaluationTimeout(TimeoutError):
+    """Injected timeout of objective evaluation"""
+
+
+class Latency:
+    """Synthetic cost of objective evaluation, delay of every evaluation is drawn from distribution.
+
+    Distributions are parametrized by delay scale:
+        constant     - every delay is scale
+        lognormal    - scale * exp(sigma * N(0, 1)), scale is median delay
+        heavyTailed  - Pareto with tail index alpha, scale is minimum delay and median is scale * 2 ** (1 / alpha),
+                       variance is infinite for alpha <= 2
+    Delay longer than timeout is cut at timeout and evaluation raises EvaluationTimeout.
+    """
+
+    DISTRIBUTIONS = ['constant', 'lognormal', 'heavyTailed']
+
+    def __init__(self, distribution='constant', scale=0.01, sigma=1., alpha=1.5, failureRate=0., timeoutRate=0.,
+                 timeout: float = None, rng: rngs.Seed = None, sleep: Callable[[float], None] = time.sleep):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f'Unknown latency distribution {distribution}, use one of {self.DISTRIBUTIONS}')
+        if timeoutRate > 0 and timeout is None:
+            raise ValueError('Timeout injection needs timeout')
+
+        self.distribution = distribution
+        self.scale = scale
+        self.sigma = sigma
+        self.alpha = alpha
+        self.failureRate = failureRate
+        self.timeoutRate = timeoutRate
+        self.timeout = timeout
+        self.rng = rngs.generator(rng)
+        self.sleep = sleep
+
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.totalDelay = 0.
+
+    def delay(self) -> float:
+        if self.distribution == 'constant':
+            return self.scale
+        elif self.distribution == 'lognormal':
+            return self.scale * float(self.rng.lognormal(0, self.sigma))
+        return self.scale * (1 + float(self.rng.pareto(self.alpha)))
+
+    def __wait(self, delay):
+        self.totalDelay += delay
+        self.sleep(delay)
+
+    def __call__(self, fun: Callable, *args):
+        """Calls fun after drawn delay, injected failures are raised after the delay as remote errors would"""
+        self.calls += 1
+        delay = self.delay()
+        if self.timeout is not None and (delay > self.timeout or self.rng.random() < self.timeoutRate):
+            self.timeouts += 1
+            self.__wait(self.timeout)
+            raise EvaluationTimeout(f'Evaluation timed out after {self.timeout}s')
+
+        self.__wait(delay)
+        if self.failureRate > 0 and self.rng.random() < self.failureRate:
+            self.failures += 1
+            raise EvaluationFailure('Injected evaluation failure')
+        return fun(*args)
+
+    def stats(self):
+        return {'calls': self.calls, 'failures': self.failures, 'timeouts': self.timeouts, 'totalDelay': self.totalDelay}
@@ -0,0 +1,135 @@
+import math
+from typing import Dict, List, Tuple, Any
+
+from src.math.linalg import pointInTriangle
+
+Edge = Tuple[Any, Any]
+
+
+class TriangleGrid:
+    """Multi level uniform grid of triangles, triangle is stored on level with cells as big as its bounding box.
+
+    Every triangle is in at most 4 cells of its level, so triangle that contains position is found by
+    checking one cell on every used level.
+    """
+
+    def __init__(self):
+        self.cells: Dict[Tuple[int, int, int], Dict[Any, None]] = {}  # (level, x, y) -> triangles
+        self.levels: Dict[int, int] = {}  # Level -> number of triangles
+        self.keys: Dict[Any, List[Tuple[int, int, int]]] = {}  # Triangle -> cells
+
+    @staticmethod
+    def cell(level, x, y) -> Tuple[int, int, int]:
+        size = 2.0 ** level
+        return level, math.floor(x / size), math.floor(y / size)
+
+    def add(self, triangle):
+        xs = [p.x for p in triangle.points]
+        ys = [p.y for p in triangle.points]
+        level = math.frexp(max(max(xs) - min(xs), max(ys) - min(ys)))[1]
+
+        _, x0, y0 = self.cell(level, min(xs), min(ys))
+        _, x1, y1 = self.cell(level, max(xs), max(ys))
+        keys = [(level, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+        for key in keys:
+            self.cells.setdefault(key, {})[triangle] = None
+        self.keys[triangle] = keys
+        self.levels[level] = self.levels.get(level, 0) + 1
+
+    def remove(self, triangle):
+        keys = self.keys.pop(triangle)
+        for key in keys:
+            cell = self.cells[key]
+            del cell[triangle]
+            if not cell:
+                del self.cells[key]
+
+        level = keys[0][0]
+        self.levels[level] -= 1
+        if self.levels[level] == 0:
+            del self.levels[level]
+
+    def locate(self, vector, exclude=()):
+        """Returns triangle that contains vector, triangles in exclude are skiped"""
+        x, y = vector
+        for level in self.levels:
+            for t in self.cells.get(self.cell(level, x, y), ()):
+                if t not in exclude and pointInTriangle(vector, *[p.vector for p in t.points]):
+                    return t
+        return None
+
+
+class TriangleMesh:
+    """Edge table of live triangles, edges are keyed by end points and splited edges are linked with their halves.
+
+    Triangles of partitioned mesh can have hanging points on their sides, so side of one triangle can lie
+    inside of longer side of its neighbour. Links between splited edge and its halves give nested sides in O(depth)
+    without any geometric test.
+    """
+
+    def __init__(self):
+        self.triangles: Dict[Any, int] = {}  # Live triangle -> creation number, in order of creation
+        self.created = 0  # Number of triangles ever added
+        self.edges: Dict[Edge, Dict[Any, None]] = {}  # Edge -> triangles that have it as side
+        self.midpoints: Dict[Edge, Any] = {}  # Splited edge -> middle point
+        self.parents: Dict[Edge, Edge] = {}  # Half of edge -> splited edge
+        self.grid = TriangleGrid()
+
+    @staticmethod
+    def edge(p1, p2) -> Edge:
+        return (p1, p2) if id(p1) < id(p2) else (p2, p1)
+
+    def add(self, triangle):
+        self.triangles[triangle] = self.created
+        self.created += 1
+        self.grid.add(triangle)
+        for line in triangle.lines:
+            self.edges.setdefault(self.edge(*line.points), {})[triangle] = None
+
+    def remove(self, triangle):
+        del self.triangles[triangle]
+        self.grid.remove(triangle)
+        for line in triangle.lines:
+            edge = self.edge(*line.points)
+            sides = self.edges[edge]
+            del sides[triangle]
+            if not sides:
+                del self.edges[edge]
+
+    def split(self, p1, p2, midpoint):
+        edge = self.edge(p1, p2)
+        self.midpoints[edge] = midpoint
+        self.parents[self.edge(p1, midpoint)] = edge
+        self.parents[self.edge(midpoint, p2)] = edge
+
+    def nestedEdges(self, p1, p2) -> List[Edge]:
+        """Returns edge, all edges it lies in and its halves that start in its end points"""
+        edge = self.edge(p1, p2)
+        nested = [edge]
+        parent = self.parents.get(edge)
+        while parent is not None:
+            nested.append(parent)
+            parent = self.parents.get(parent)
+        for end in [p1, p2]:
+            half = edge
+            while half in self.midpoints:
+                half = self.edge(end, self.midpoints[half])
+                nested.append(half)
+        return nested
+
+    def across(self, triangle, line) -> List:
+        """Returns triangles on the other side of triangle line, they share whole line or part of it"""
+        triangles = {}
+        for edge in self.nestedEdges(*line.points):
+            triangles.update(self.edges.get(edge, {}))
+        triangles.pop(triangle, None)
+        return list(triangles)
+
+    def coincidingTriangles(self, triangle) -> List:
+        """Returns triangles with common point and side that overlaps with side of given triangle"""
+        coinciding = {}
+        for line in triangle.lines:
+            coinciding.update(dict.fromkeys(self.across(triangle, line)))
+
+        # Triangles are given in order of creation
+        return sorted(coinciding, key=self.triangles.__getitem__)
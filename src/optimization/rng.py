@@ -0,0 +1,30 @@
+from typing import List, Union
+
+import numpy as np
+
+Seed = Union[None, int, np.random.SeedSequence, np.random.Generator]
+
+
+def generator(seed: Seed = None) -> np.random.Generator:
+    """Returns generator from seed, generator is returned as it is so streams can be shared"""
+    return np.random.default_rng(seed)
+
+
+def spawn(seed: Seed, count) -> List[np.random.Generator]:
+    """Returns independent generators for parallel runs, same seed always gives same streams"""
+    if isinstance(seed, np.random.Generator):
+        return seed.spawn(count)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed.spawn(count)]
+
+
+def getState(rng: np.random.Generator) -> dict:
+    return rng.bit_generator.state
+
+
+def fromState(state: dict) -> np.random.Generator:
+    """Returns generator that continues stream of saved generator state"""
+    bitGenerator = getattr(np.random, state['bit_generator'])()
+    bitGenerator.state = state
+    return np.random.Generator(bitGenerator)
@@ -1,20 +1,90 @@
 import csv
+import hashlib
 import inspect
-from random import random
+import json
+import os
+from collections import OrderedDict
 from statistics import mean
-from typing import List
+from typing import Callable, List, Dict
 
 from libs import go_benchmark_functions
 from libs.go_benchmark_functions.go_benchmark import Benchmark
 import numpy as np
 
 from src import utils
+from src.optimization import rng as rngs
+from src.optimization.latency import Latency
+from src.optimization.trace import TraceLog
+
+
+class Batch(np.ndarray):
+    """Transposed batch of vectors, last axis goes over vectors.
+
+    Benchmarks reduce vector with numpy sum, prod, ... without axis, on batch this reductions go over all axes
+    except the last one, so formula written for one vector gives value of every vector in batch.
+    """
+
+    def __reduce_axis(self, axis):
+        return tuple(range(self.ndim - 1)) if axis is None else axis
+
+    def sum(self, axis=None, *args, **kwargs):
+        return super().sum(self.__reduce_axis(axis), *args, **kwargs)
+
+    def prod(self, axis=None, *args, **kwargs):
+        return super().prod(self.__reduce_axis(axis), *args, **kwargs)
+
+    def mean(self, axis=None, *args, **kwargs):
+        return super().mean(self.__reduce_axis(axis), *args, **kwargs)
+
+    def max(self, axis=None, *args, **kwargs):
+        return super().max(self.__reduce_axis(axis), *args, **kwargs)
+
+    def min(self, axis=None, *args, **kwargs):
+        return super().min(self.__reduce_axis(axis), *args, **kwargs)
+
+
+class EvaluationCache:
+    """Values of evaluated vectors keyed by exact bytes of coordinates, least recently used value is evicted first"""
+
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.values: Dict[bytes, float] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(vector) -> bytes:
+        return np.asarray(vector, dtype=float).tobytes()
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, key):
+        value = self.values.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.values.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.values[key] = value
+        self.values.move_to_end(key)
+        if len(self.values) > self.maxSize:
+            self.values.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict:
+        calls = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.values), 'hitRate': self.hits / calls if calls else 0.}
 
 
 class Function:
+    PROBES = 8  # Number of vectors on which batched formula is compared with loop
 
     @staticmethod
-    def __function_dim(fun: Benchmark) -> int:
+    def functionDim(fun: Benchmark) -> int:
         signature = inspect.signature(fun.__init__)
         parameters = {
             k: v.default
@@ -23,10 +93,11 @@ class Function:
         }
         return parameters.get('dimensions')
 
-    def __init__(self, f: Benchmark, hardness=-1, rand=False):
+    def __init__(self, f: Benchmark, hardness=-1, rand=False, rng: rngs.Seed = None):
+        self.rng = rngs.generator(rng)
         self.benchmark: Benchmark = f()
         self.hardness = hardness
-        self.dimensions = self.__function_dim(f)
+        self.dimensions = self.functionDim(f)
         self.name = str(f).split('.')[-1][:-2]
 
         self.minValue = np.nan_to_num(self.benchmark.fglob)
@@ -36,6 +107,12 @@ class Function:
 
         self.hc2 = None
         self.hcN = None
+        self.__vectorized = None
+        self.cache: EvaluationCache = None
+        self.latency: Latency = None
+        self.trace: TraceLog = None
+        self.listener: Callable[[int, float], None] = None
+        self.phase = ''  # Phase of optimizer that asks for evaluations, it is written to trace
 
         self.__fix_dimensions()
         self.init(rand)
@@ -74,29 +151,223 @@ class Function:
         if minOnCenter or rand:
             for i in range(len(self.bounds)):
                 diff = self.bounds[i][1] - self.bounds[i][0]
-                self.bounds[i][0] += diff / 20 * (1 + random())
+                self.bounds[i][0] += diff / 20 * (1 + self.rng.random())
 
-    def __call__(self, vector):
-        self.evaluation += 1
+    def setCache(self, maxSize=None):
+        """Memoizes counted evaluations in LRU cache of given size, cached vectors are not counted again, None disables cache"""
+        self.cache = None if maxSize is None else EvaluationCache(maxSize)
+
+    def setLatency(self, latency: Latency = None):
+        """Every evaluation is delayed and can fail as given synthetic latency tells, None disables latency"""
+        self.latency = latency
+
+    def setTrace(self, trace: TraceLog = None):
+        """Every counted evaluation is appended to trace log, None disables trace"""
+        self.trace = trace
+
+    def setListener(self, listener: Callable[[int, float], None] = None):
+        """Listener is called with sequence number and value of every counted evaluation, None disables listener"""
+        self.listener = listener
+
+    def record(self, vector, value, seq=None):
+        """Appends counted evaluation to trace, callers that count evaluations by them self give its sequence number"""
+        seq = self.evaluation if seq is None else seq
+        if self.trace is not None:
+            self.trace.append(seq, vector, value, self.phase)
+        if self.listener is not None:
+            self.listener(seq, value)
+
+    def __getstate__(self):
+        # Trace is mapped file of the process that owns it, copies of function in workers don't write to it
+        state = self.__dict__.copy()
+        state['trace'] = None
+        state['listener'] = None
+        return state
+
+    def __evaluate(self, vector):
         return np.nan_to_num(self.benchmark.fun(np.array(vector)))
 
+    def evaluate(self, vector):
+        """Evaluates benchmark without counting the evaluation"""
+        if self.latency is not None:
+            return self.latency(self.__evaluate, vector)
+        return self.__evaluate(vector)
+
+    def __call__(self, vector):
+        if self.cache is None:
+            self.evaluation += 1
+            value = self.evaluate(vector)
+            self.record(vector, value)
+            return value
+
+        key = self.cache.key(vector)
+        value = self.cache.get(key)
+        if value is None:
+            self.evaluation += 1
+            value = self.cache.put(key, self.evaluate(vector))
+            self.record(vector, value)
+        return value
+
+    def __recordMany(self, vectors, values):
+        seqs = np.arange(self.evaluation - len(values) + 1, self.evaluation + 1)
+        if self.trace is not None:
+            self.trace.extend(seqs, vectors, values, self.phase)
+        if self.listener is not None:
+            for seq, value in zip(seqs.tolist(), values.tolist()):
+                self.listener(seq, value)
+
+    def __evaluateLoop(self, vectors: np.ndarray) -> np.ndarray:
+        return np.array([self.benchmark.fun(vector) for vector in vectors], dtype=float)
+
+    def __evaluateBatch(self, vectors: np.ndarray):
+        """Returns values of benchmark formula applied on whole batch or None if formula can't take batch"""
+        try:
+            with np.errstate(all='ignore'):
+                values = self.benchmark.fun(vectors.T.copy().view(Batch))
+            values = np.asarray(values, dtype=float)
+        except Exception:
+            return None
+        return values if values.shape == (len(vectors),) else None
+
+    @property
+    def vectorized(self) -> bool:
+        """Tells if benchmark formula gives same values on batch as on every vector alone, checked once on probe vectors"""
+        if self.__vectorized is None:
+            bounds = np.array(self.bounds, dtype=float)
+            probes = np.random.default_rng(0).uniform(bounds[:, 0], bounds[:, 1], (self.PROBES, len(bounds)))
+            with np.errstate(all='ignore'):
+                expected = np.nan_to_num(self.__evaluateLoop(probes))
+            values = self.__evaluateBatch(probes)
+            self.__vectorized = values is not None and np.allclose(np.nan_to_num(values), expected, rtol=1e-9, atol=1e-12)
+        return self.__vectorized
+
+    def evaluateMany(self, vectors) -> np.ndarray:
+        """Evaluates benchmark on (n, d) array of vectors without counting evaluations, returns n values"""
+        vectors = np.array(vectors, dtype=float).reshape(-1, len(self.bounds))
+        if self.latency is not None:
+            # Every vector pays its own latency
+            return np.array([self.evaluate(vector) for vector in vectors], dtype=float)
+        values = self.__evaluateBatch(vectors) if self.vectorized else None
+        if values is None:
+            values = self.__evaluateLoop(vectors)
+        return np.nan_to_num(values)
+
+    def callMany(self, vectors) -> np.ndarray:
+        """Evaluates benchmark on (n, d) array of vectors, every vector is counted as evaluation"""
+        if self.cache is None:
+            vectors = np.array(vectors, dtype=float).reshape(-1, len(self.bounds))
+            values = self.evaluateMany(vectors)
+            self.evaluation += len(values)
+            self.__recordMany(vectors, values)
+            return values
+
+        vectors = np.array(vectors, dtype=float).reshape(-1, len(self.bounds))
+        values = np.empty(len(vectors))
+        missing: Dict[bytes, List[int]] = {}  # Key -> rows of vectors with that key
+        for row, vector in enumerate(vectors):
+            key = self.cache.key(vector)
+            if key in missing:
+                # Repeated in batch, it is evaluated only once
+                self.cache.hits += 1
+                missing[key].append(row)
+                continue
+            value = self.cache.get(key)
+            if value is None:
+                missing[key] = [row]
+            else:
+                values[row] = value
+
+        if missing:
+            rows = list(missing.values())
+            evaluatedVectors = vectors[[r[0] for r in rows]]
+            evaluated = self.evaluateMany(evaluatedVectors)
+            self.evaluation += len(evaluated)
+            self.__recordMany(evaluatedVectors, evaluated)
+            for key, r, value in zip(missing, rows, evaluated.tolist()):
+                values[r] = self.cache.put(key, value)
+        return values
+
     def __str__(self):
         return f'{self.name}(dim={self.dimensions}, hard={self.hardness}%, minVec={self.minVectors}, min={self.minValue})'
 
 
-def functions() -> List[Function]:
+class FunctionInfo:
+    """Metadata of benchmark from registry, bounds are bounds of benchmark before any random shift"""
+
+    def __init__(self, name, dimensions, hardness, bounds, fglob):
+        self.name = name
+        self.dimensions = dimensions
+        self.hardness = hardness
+        self.bounds = bounds
+        self.fglob = fglob
+
+    def load(self, rand=False, rng: rngs.Seed = None) -> Function:
+        return Function(getattr(go_benchmark_functions, self.name), hardness=self.hardness, rand=rand, rng=rng)
+
+    def __str__(self):
+        return f'{self.name}(dim={self.dimensions}, hard={self.hardness}%, min={self.fglob})'
+
+
+CACHE_DIR = utils.getPath(__file__, '../../data/cache')
+HARDNESS_PATH = utils.getPath(__file__, '../../data/go_benchmark_functions_hardness.csv')
+
+
+def libraryKey() -> str:
+    """Returns hash of benchmark library sources and hardness table, registry cache is valid only for same key"""
+    sha = hashlib.sha256()
+    library = utils.getPath(go_benchmark_functions.__file__)
+    for path in sorted(library.glob('*.py')) + [HARDNESS_PATH]:
+        sha.update(path.name.encode())
+        sha.update(path.read_bytes())
+    return sha.hexdigest()
+
+
+def buildRegistry() -> List[FunctionInfo]:
     gbfh = {}
-    with open(utils.getPath(__file__, '../../data/go_benchmark_functions_hardness.csv')) as f:
+    with open(HARDNESS_PATH) as f:
         csvf = csv.DictReader(f)
         for row in csvf:
             gbfh[row['name']] = {'hardness': 100 - float(row['hardness']), 'dim': int(row['dim'])}
 
-    funs = []
+    infos = []
     for funName, benchmark in go_benchmark_functions.__dict__.items():
         if inspect.isclass(benchmark):
             if issubclass(benchmark, Benchmark) and funName not in ['Benchmark']:
-                info = gbfh.get(funName, {})
-                fun = Function(f=benchmark, hardness=info.get('hardness', -1))
-                funs.append(fun)
+                b = benchmark()
+                infos.append(FunctionInfo(
+                    name=funName,
+                    dimensions=Function.functionDim(benchmark),
+                    hardness=gbfh.get(funName, {}).get('hardness', -1),
+                    bounds=[[float(v) for v in bound] for bound in b.bounds],
+                    fglob=float(np.nan_to_num(b.fglob)),
+                ))
+    return infos
+
+
+def registry(cacheDir=CACHE_DIR) -> List[FunctionInfo]:
+    """Returns metadata of all benchmarks in library order, it is read from cache file if library didn't change"""
+    key = libraryKey()
+    path = None if cacheDir is None else os.path.join(cacheDir, 'registry.json')
+    if path is not None and os.path.exists(path):
+        with open(path) as f:
+            cache = json.load(f)
+        if cache['key'] == key:
+            return [FunctionInfo(**info) for info in cache['functions']]
+
+    infos = buildRegistry()
+    if path is not None:
+        try:
+            os.makedirs(cacheDir, exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump({'key': key, 'functions': [info.__dict__ for info in infos]}, f)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass  # Registry still works without cache
+    return infos
+
 
+def functions(rng: rngs.Seed = None) -> List[Function]:
+    """Returns all benchmark functions, random shifts of bounds are drawn from one generator in order of functions"""
+    rng = rngs.generator(rng)
+    funs = [info.load(rng=rng) for info in registry()]
     return sorted(funs, key=lambda f: f.hardness, reverse=True)
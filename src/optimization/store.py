@@ -0,0 +1,467 @@
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+
+class IdRows:
+    """Growable rows of ids kept in one pool array, row is moved to the end of pool when it outgrows its capacity.
+
+    Space of moved and cleared rows is reclaimed when pool is full and at least quarter of it is free.
+    """
+
+    def __init__(self, rows=1024, capacity=4096):
+        self.size = 0  # Used length of pool
+        self.garbage = 0  # Length of pool that is not used by any row
+        self.pool = np.empty(capacity, dtype=np.int32)
+        self.start = np.zeros(rows, dtype=np.int64)
+        self.count = np.zeros(rows, dtype=np.int32)
+        self.capacity = np.zeros(rows, dtype=np.int32)
+
+    @classmethod
+    def fromArrays(cls, offsets: np.ndarray, ids: np.ndarray):
+        rows = cls(max(len(offsets) - 1, 1), max(2 * len(ids), 1))
+        counts = np.diff(offsets)
+        rows.start[:len(counts)] = offsets[:-1]
+        rows.count[:len(counts)] = counts
+        rows.capacity[:len(counts)] = counts
+        rows.pool[:len(ids)] = ids
+        rows.size = len(ids)
+        return rows
+
+    def arrays(self, rows) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns offsets and ids of first rows packed without free space"""
+        offsets = np.zeros(rows + 1, dtype=np.int64)
+        np.cumsum(self.count[:rows], out=offsets[1:])
+        return offsets, self.pool[self.__positions(rows)]
+
+    @property
+    def nbytes(self):
+        return self.pool.nbytes + self.start.nbytes + self.count.nbytes + self.capacity.nbytes
+
+    def __getitem__(self, row) -> np.ndarray:
+        start = self.start[row]
+        return self.pool[start:start + self.count[row]]
+
+    def reserve(self, rows):
+        """Grows headers so that there are at least given number of rows"""
+        if rows > len(self.count):
+            for name in ['start', 'count', 'capacity']:
+                old = getattr(self, name)
+                new = np.zeros(rows, dtype=old.dtype)
+                new[:len(old)] = old
+                setattr(self, name, new)
+
+    def set(self, row, ids):
+        self.clear(row)
+        self.__allocate(row, max(len(ids), 1))
+        start = self.start[row]
+        self.pool[start:start + len(ids)] = ids
+        self.count[row] = len(ids)
+
+    def append(self, row, id):
+        count = self.count[row]
+        if count == self.capacity[row]:
+            self.__move(row, count + count // 2 + 1)
+        self.pool[self.start[row] + count] = id
+        self.count[row] = count + 1
+
+    def extend(self, row, ids):
+        count = self.count[row]
+        if count + len(ids) > self.capacity[row]:
+            self.__move(row, int(count + len(ids)) * 3 // 2)
+        start = self.start[row] + count
+        self.pool[start:start + len(ids)] = ids
+        self.count[row] = count + len(ids)
+
+    def remove(self, row, id):
+        ids = self[row]
+        positions = np.flatnonzero(ids == id)
+        if len(positions) == 0:
+            raise Exception("Id is not in row, this should not happened!")
+        ids[positions[0]:-1] = ids[positions[0] + 1:]
+        self.count[row] -= 1
+
+    def replace(self, row, id, ids):
+        """Replaces id in row with given ids, first of them takes its place and others are appended"""
+        positions = np.flatnonzero(self[row] == id)
+        if len(positions) == 0:
+            raise Exception("Id is not in row, this should not happened!")
+        self.pool[self.start[row] + positions[0]] = ids[0]
+        self.extend(row, ids[1:])
+
+    def clear(self, row):
+        self.garbage += int(self.capacity[row])
+        self.count[row] = 0
+        self.capacity[row] = 0
+
+    def __move(self, row, capacity):
+        ids = self[row].copy()
+        self.clear(row)
+        self.__allocate(row, max(capacity, 1))
+        self.pool[self.start[row]:self.start[row] + len(ids)] = ids
+        self.count[row] = len(ids)
+
+    def __allocate(self, row, capacity):
+        if self.size + capacity > len(self.pool):
+            if 4 * self.garbage >= self.size:
+                self.__compact()
+            if self.size + capacity > len(self.pool):
+                pool = np.empty(3 * (self.size + capacity) // 2, dtype=np.int32)
+                pool[:self.size] = self.pool[:self.size]
+                self.pool = pool
+        self.start[row] = self.size
+        self.capacity[row] = capacity
+        self.size += capacity
+
+    def __positions(self, rows) -> np.ndarray:
+        """Returns positions in pool of all ids in first rows in order of rows"""
+        counts = self.count[:rows].astype(np.int64)
+        firsts = np.cumsum(counts) - counts
+        return np.repeat(self.start[:rows] - firsts, counts) + np.arange(counts.sum())
+
+    def __compact(self):
+        rows = len(self.count)
+        capacity = self.capacity.astype(np.int64)
+        start = np.cumsum(capacity) - capacity
+        counts = self.count.astype(np.int64)
+        firsts = np.cumsum(counts) - counts
+        positions = np.repeat(start - firsts, counts) + np.arange(counts.sum())
+
+        pool = np.empty_like(self.pool)
+        pool[positions] = self.pool[self.__positions(rows)]
+        self.pool = pool
+        self.start = start
+        self.size = int(capacity.sum())
+        self.garbage = 0
+
+
+class CubeStore:
+    """Structure of arrays that holds state of all cubes of one tree, cubes are addressed by row id.
+
+    Cube is a cell of dyadic lattice of root cube, on each axis it spans [index, index + 1] / 2**level of root cube,
+    so its bounds and center are computed from lattice coordinates. Central point of cube has the id of its cube.
+    Partitioned cubes are hashed by their lattice coordinates, so neighbours across a face are found by lookup.
+    """
+
+    ARRAYS = ['level', 'index', 'generation', 'value', 'parent', 'children', 'phase', 'localMin']
+    DEFAULTS = {'value': np.nan, 'parent': -1, 'children': -1, 'localMin': -1}
+
+    def __init__(self, bounds: List[List[float]], capacity=1024):
+        self.dim = len(bounds)
+        self.origin = np.array([bound[0] for bound in bounds], dtype=float)
+        self.width = np.array([bound[1] - bound[0] for bound in bounds], dtype=float)
+
+        self.level = np.zeros((capacity, self.dim), dtype=np.int8)
+        self.index = np.zeros((capacity, self.dim), dtype=np.int64)
+        self.generation = np.zeros(capacity, dtype=np.int16)
+        self.value = np.full(capacity, np.nan)
+        self.parent = np.full(capacity, -1, dtype=np.int32)  # Partitioned cube that cube was created from, root has -1
+        self.children = np.full(capacity, -1, dtype=np.int32)  # First child of partitioned cube, end cubes have -1
+        self.phase = np.zeros(capacity, dtype=np.int8)  # Search phase of optimizer that created the cube
+        self.localMin = np.full(capacity, -1, dtype=np.int8)  # Cached local minimum test of central point, -1 if unknown
+
+        # Central points of partitioned cubes that are in closure of cube, rows never change so they are packed by id
+        self.parentsOffsets = np.zeros(capacity + 1, dtype=np.int64)
+        self.parents = np.empty(capacity, dtype=np.int32)
+        self.adjacent = IdRows(capacity)  # End cube -> adjacent end cubes
+        self.intersecting = IdRows(capacity)  # Point -> end cubes that have point in closure
+        self.cells: Dict[bytes, int] = {}  # Lattice key -> partitioned cube
+
+        # Root cube
+        self.size = 1
+        self.intersecting.set(0, [0])
+
+    @classmethod
+    def fromArrays(cls, arrays: Dict[str, np.ndarray]):
+        size = len(arrays['value'])
+        store = cls([[o, o + w] for o, w in zip(arrays['origin'].tolist(), arrays['width'].tolist())], capacity=size)
+        store.origin, store.width, store.size = arrays['origin'], arrays['width'], size
+        for name in cls.ARRAYS:
+            getattr(store, name)[:size] = arrays[name]
+        store.parentsOffsets[:size + 1] = arrays['parents_offsets']
+        store.parents = arrays['parents'].astype(np.int32)
+        store.adjacent = IdRows.fromArrays(arrays['adjacent_offsets'], arrays['adjacent'])
+        store.intersecting = IdRows.fromArrays(arrays['intersecting_offsets'], arrays['intersecting'])
+        for id in np.flatnonzero(store.children[:size] >= 0).tolist():
+            store.cells[store.cellKey(store.level[id], store.index[id])] = id
+        return store
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {name: getattr(self, name)[:self.size] for name in self.ARRAYS}
+        arrays['origin'], arrays['width'] = self.origin, self.width
+        arrays['parents_offsets'] = self.parentsOffsets[:self.size + 1]
+        arrays['parents'] = self.parents[:self.parentsOffsets[self.size]]
+        arrays['adjacent_offsets'], arrays['adjacent'] = self.adjacent.arrays(self.size)
+        arrays['intersecting_offsets'], arrays['intersecting'] = self.intersecting.arrays(self.size)
+        return arrays
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self.value)
+
+    @property
+    def nbytes(self):
+        arrays = sum(getattr(self, name).nbytes for name in self.ARRAYS)
+        return arrays + self.parentsOffsets.nbytes + self.parents.nbytes + self.adjacent.nbytes + self.intersecting.nbytes
+
+    def reserve(self, size):
+        capacity = self.capacity
+        while capacity < self.size + size:
+            capacity += capacity // 2
+        if capacity != self.capacity:
+            self.__grow(capacity)
+
+    def cell(self, id) -> np.ndarray:
+        """Returns lengths of cube sides"""
+        return np.ldexp(self.width, -self.level[id].astype(np.int32))
+
+    def center(self, id) -> np.ndarray:
+        return self.origin + (self.index[id] + .5) * self.cell(id)
+
+    def bounds(self, id) -> List[List[float]]:
+        cell = self.cell(id)
+        lower = self.origin + self.index[id] * cell
+        upper = self.origin + (self.index[id] + 1) * cell
+        return [list(bound) for bound in zip(lower.tolist(), upper.tolist())]
+
+    def cellKey(self, level: np.ndarray, index: np.ndarray) -> bytes:
+        """Returns exact key of lattice cell, bytes of its level and then of its index on each axis"""
+        return level.astype(np.int8).tobytes() + index.astype(np.int64).tobytes()
+
+    def faceNeighbours(self, id) -> np.ndarray:
+        """Returns end cubes that share part of a face with cube, cubes across lower face of first axis are first"""
+        # Cell across the face is searched on lattice levels of cube and its ancestors, root contains every cell
+        ancestors = [id]
+        while self.parent[ancestors[-1]] >= 0:
+            ancestors.append(int(self.parent[ancestors[-1]]))
+        levels, indexes = self.level[ancestors], self.index[ancestors]
+        shifts = levels[0].astype(np.int64) - levels
+
+        neighbours = []
+        for axis in range(self.dim):
+            for upper in [False, True]:
+                across = int(indexes[0, axis]) + (1 if upper else -1)
+                if not 0 <= across < 1 << int(levels[0, axis]):
+                    continue
+                probes = indexes.copy()
+                probes[:, axis] = across >> shifts[:, axis]
+                keys = np.concatenate((levels.view(np.uint8), probes.view(np.uint8)), axis=1)
+                cell = next(self.cells[key] for key in map(bytes, keys) if key in self.cells)
+                neighbours += self.__endCubesAcross(cell, id, axis, upper)
+        return np.array(neighbours, dtype=np.int32)
+
+    def parentsOf(self, id) -> np.ndarray:
+        return self.parents[self.parentsOffsets[id]:self.parentsOffsets[id + 1]]
+
+    def intersectingPoints(self, ids: np.ndarray) -> np.ndarray:
+        """Returns central points and parents points of cubes, point is repeated for every cube that has it"""
+        starts, ends = self.parentsOffsets[ids], self.parentsOffsets[ids + 1]
+        counts = ends - starts
+        firsts = np.cumsum(counts) - counts
+        parents = self.parents[np.repeat(starts - firsts, counts) + np.arange(counts.sum())]
+        return np.concatenate((ids, parents))
+
+    def containsCenters(self, points: np.ndarray, ids) -> np.ndarray:
+        """Returns mask of shape (points, ids) which tells if central point is in closed cube"""
+        # Central point is on odd index of lattice one level deeper, cubes are compared on the finest level of both
+        pointLevel = self.level[points].astype(np.int64)[:, None] + 1
+        pointIndex = 2 * self.index[points][:, None] + 1
+        level, index = self.level[ids].astype(np.int64)[None], self.index[ids][None]
+        maxLevel = np.maximum(pointLevel, level)
+        center = pointIndex << (maxLevel - pointLevel)
+        start, end = index << (maxLevel - level), (index + 1) << (maxLevel - level)
+        return np.all((start <= center) & (center <= end), axis=2)
+
+    def __endCubesAcross(self, cell, id, axis, upper) -> List[int]:
+        """Returns end cubes in cell which are across upper or lower face of cube on axis and overlap it"""
+        # Only halves that reach the face are followed down, intervals are compared on the finer level of both
+        cubeLevel, cubeIndex = self.level[id].tolist(), self.index[id].tolist()
+        endCubes = []
+        cells = [cell]
+        while cells:
+            cell = cells.pop()
+            first = int(self.children[cell])
+            if first < 0:
+                endCubes.append(cell)
+                continue
+            offsets = [0]
+            for a, (cellLevel, childLevel, cellIndex) in enumerate(zip(self.level[cell].tolist(), self.level[first].tolist(), self.index[cell].tolist())):
+                if cellLevel == childLevel:
+                    continue
+                fineLevel = max(childLevel, cubeLevel[a])
+                cubeStart = cubeIndex[a] << (fineLevel - cubeLevel[a])
+                cubeEnd = (cubeIndex[a] + 1) << (fineLevel - cubeLevel[a])
+                halves = []
+                for half in [0, 1]:
+                    start = (2 * cellIndex + half) << (fineLevel - childLevel)
+                    end = (2 * cellIndex + half + 1) << (fineLevel - childLevel)
+                    if a != axis:
+                        reaches = start < cubeEnd and cubeStart < end
+                    elif upper:
+                        reaches = start <= cubeEnd < end
+                    else:
+                        reaches = start < cubeStart <= end
+                    if reaches:
+                        halves.append(half)
+                offsets = [2 * offset + half for offset in offsets for half in halves]
+            cells += [first + offset for offset in reversed(offsets)]
+        return endCubes
+
+    def shareFace(self, ids: np.ndarray, cubes: np.ndarray) -> np.ndarray:
+        """Returns mask of shape (ids, cubes) which tells if cubes touch on one axis and overlap on all others"""
+        level, index = self.level[ids].astype(np.int64)[:, None], self.index[ids][:, None]
+        cubeLevel, cubeIndex = self.level[cubes].astype(np.int64)[None], self.index[cubes][None]
+        maxLevel = np.maximum(level, cubeLevel)
+        start, end = index << (maxLevel - level), (index + 1) << (maxLevel - level)
+        cubeStart, cubeEnd = cubeIndex << (maxLevel - cubeLevel), (cubeIndex + 1) << (maxLevel - cubeLevel)
+
+        touching = np.all((start <= cubeEnd) & (cubeStart <= end), axis=2)
+        overlapping = np.sum((start < cubeEnd) & (cubeStart < end), axis=2)
+        return touching & (overlapping == self.dim - 1)
+
+    def partition(self, id, axes: List[int] = None) -> range:
+        """Adds all children of cube split on the middle of given axes, lowest axis is most significant bit of child position.
+
+        Children are connected with points in their closure instead of partitioned cube, adjacency is left to caller.
+        """
+        axes = list(range(self.dim)) if axes is None else sorted(axes)
+        count = 2 ** len(axes)
+        self.reserve(count)
+        ids = range(self.size, self.size + count)
+
+        # Bit of child on axis tells if child is in upper half of the axis
+        upperHalf = np.zeros((count, self.dim), dtype=np.int64)
+        upperHalf[:, axes] = (np.arange(count)[:, None] >> np.arange(len(axes) - 1, -1, -1)) & 1
+        splited = np.zeros(self.dim, dtype=np.int8)
+        splited[axes] = 1
+
+        self.level[ids.start:ids.stop] = self.level[id] + splited
+        self.index[ids.start:ids.stop] = np.where(splited, 2 * self.index[id] + upperHalf, self.index[id])
+        self.generation[ids.start:ids.stop] = self.generation[id] + 1
+        self.parent[ids.start:ids.stop] = id
+        self.children[id] = ids.start
+        self.cells[self.cellKey(self.level[id], self.index[id])] = id
+        self.size += count
+
+        # Parents points of child are central point of partitioned cube and its parents points that are in closed child
+        points = np.concatenate(([id], self.parentsOf(id))).astype(np.int32)
+        inside = np.ones((count, len(points)), dtype=bool)
+        inside[:, 1:] = self.containsCenters(points[1:], ids).T
+        parents = np.broadcast_to(points, inside.shape)[inside]
+        start = self.parentsOffsets[ids.start]
+        if start + len(parents) > len(self.parents):
+            self.parents = np.concatenate((self.parents[:start], np.empty(start + 2 * len(parents), dtype=np.int32)))
+        self.parents[start:start + len(parents)] = parents
+        self.parentsOffsets[ids.start + 1:ids.stop + 1] = start + np.cumsum(inside.sum(axis=1))
+
+        # Points move from partitioned cube to children that have them in closure
+        for point, mask in zip(points.tolist(), inside.T):
+            self.intersecting.remove(point, id)
+            self.intersecting.extend(point, ids.start + np.flatnonzero(mask))
+        for child in ids:
+            self.intersecting.set(child, [child])
+        self.localMin[points] = -1
+        return ids
+
+    def __grow(self, capacity):
+        for name in self.ARRAYS:
+            old = getattr(self, name)
+            new = np.full((capacity,) + old.shape[1:], self.DEFAULTS.get(name, 0), dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+        offsets = np.zeros(capacity + 1, dtype=np.int64)
+        offsets[:self.size + 1] = self.parentsOffsets[:self.size + 1]
+        self.parentsOffsets = offsets
+        self.adjacent.reserve(capacity)
+        self.intersecting.reserve(capacity)
+
+
+class TriangleStore:
+    """Ranking attributes of triangles kept in arrays, slots are given in creation order and compacted when many are dead."""
+
+    DEAD = np.iinfo(np.int64).max  # Eval of removed slots, so they never pass eval filter
+    WEIGHTS = np.array([1., -1., -3.])
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.items: List = []
+        self.slots: Dict = {}  # Item -> slot
+
+        # Columns are evalDiff, eval and meanValue, squares are kept for fast masked norms
+        self.attributes = np.zeros((3, capacity))
+        self.squares = np.zeros((3, capacity))
+        self.eval = np.full(capacity, self.DEAD, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.slots)
+
+    @property
+    def capacity(self):
+        return len(self.eval)
+
+    def add(self, item, evalDiff, meanValue, eval) -> int:
+        if self.size == self.capacity:
+            self.__grow(2 * self.capacity)
+
+        slot = self.size
+        self.attributes[:, slot] = evalDiff, eval, meanValue
+        self.squares[:, slot] = self.attributes[:, slot] ** 2
+        self.eval[slot] = eval
+        self.items.append(item)
+        self.slots[item] = slot
+        self.size += 1
+        return slot
+
+    def remove(self, item):
+        slot = self.slots.pop(item)
+        self.eval[slot] = self.DEAD
+        self.attributes[:, slot] = 0
+        self.squares[:, slot] = 0
+        self.items[slot] = None
+
+        if self.size > 1024 and 4 * (self.size - len(self.slots)) > self.size:
+            self.compact()
+
+    def compact(self):
+        """Moves alive items to the front, creation order of items is preserved"""
+        keep = np.flatnonzero(self.eval[:self.size] != self.DEAD)
+        for array in [self.attributes, self.squares]:
+            array[:, :len(keep)] = array[:, keep]
+            array[:, len(keep):self.size] = 0
+        self.eval[:len(keep)] = self.eval[keep]
+        self.eval[len(keep):self.size] = self.DEAD
+        self.items = [self.items[slot] for slot in keep.tolist()]
+        self.slots = {item: slot for slot, item in enumerate(self.items)}
+        self.size = len(keep)
+
+    def bestRanked(self, maxEval):
+        """Returns item with highest rank among items with eval < maxEval, maxEval is raised until some item passes"""
+        eval = self.eval[:self.size]
+        mask = eval < maxEval
+        if not mask.any():
+            mask = eval == eval.min()
+
+        # rank = evalDiff/|evalDiff| + (1 - eval/|eval|) + 3 * (1 - meanValue/|meanValue|), norms are over masked items
+        weights = mask.astype(float)
+        norms = np.sqrt(self.squares[:, :self.size] @ weights)
+        if not norms.all():
+            # Zero norm makes all ranks nan, argsort puts them at the end so last item is picked
+            return self.items[np.flatnonzero(mask)[-1]]
+
+        # Unmasked items are pushed down with branchless penalty, np.where is slow on scattered masks
+        rank = (self.WEIGHTS / norms) @ self.attributes[:, :self.size] - (1 - weights) * np.finfo(float).max
+
+        # Last of equally ranked items, same as last element of argsort
+        return self.items[self.size - 1 - rank[::-1].argmax()]
+
+    def __grow(self, capacity):
+        for name in ['attributes', 'squares']:
+            array = np.zeros((3, capacity))
+            array[:, :self.size] = getattr(self, name)[:, :self.size]
+            setattr(self, name, array)
+        eval = np.full(capacity, self.DEAD, dtype=np.int64)
+        eval[:self.size] = self.eval[:self.size]
+        self.eval = eval
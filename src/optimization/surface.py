@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+from typing import List
+
+import numpy as np
+
+from src.optimization import space
+from src.optimization.space import Function
+
+
+def zoomBounds(function: Function, zoomCenter: List[float] = None, zoom=1) -> List[List[float]]:
+    """Returns bounds of function shrinked by zoom around zoom center, bounds are cut by bounds of function"""
+    bounds = [list(bound) for bound in function.bounds[:function.dimensions]]
+    if zoomCenter is not None and zoom != 1:
+        for axis, bound in enumerate(bounds):
+            axisRange = abs(bound[0] - bound[1]) / zoom
+            bounds[axis] = [max([bound[0], zoomCenter[axis] - axisRange]), min([bound[1], zoomCenter[axis] + axisRange])]
+    return bounds
+
+
+def sample(function: Function, bounds: List[List[float]], step) -> np.ndarray:
+    """Returns values of function on grid with step points on every axis, rows of 2D grid go over y axis"""
+    axes = [np.linspace(*bound, step) for bound in bounds]
+    grid = np.meshgrid(*axes)
+    values = function.callMany(np.stack([axis.ravel() for axis in grid], axis=1))
+    return values.reshape(grid[0].shape)
+
+
+class SurfaceCache:
+    """Sampled function grids saved as .npy files, grid is keyed by function, library version, bounds and step.
+
+    Zoom is part of the key through bounds of the grid. Grids are loaded read only with mmap.
+    """
+
+    def __init__(self, cacheDir=os.path.join(space.CACHE_DIR, 'surfaces')):
+        self.cacheDir = cacheDir
+        self.hits = 0
+        self.misses = 0
+        self.__libraryKey = None
+
+    def key(self, function: Function, bounds: List[List[float]], step) -> str:
+        if self.__libraryKey is None:
+            self.__libraryKey = space.libraryKey()
+        key = json.dumps([function.name, function.dimensions, self.__libraryKey, bounds, step])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def sample(self, function: Function, bounds: List[List[float]], step) -> np.ndarray:
+        path = os.path.join(self.cacheDir, f'{function.name}-{self.key(function, bounds, step)}.npy')
+        if os.path.exists(path):
+            self.hits += 1
+            return np.load(path, mmap_mode='r')
+
+        self.misses += 1
+        values = sample(function, bounds, step)
+        try:
+            os.makedirs(self.cacheDir, exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, values)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass  # Surface is still drawn without cache
+        return values
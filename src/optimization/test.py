@@ -1,13 +1,14 @@
-import random
-
+import math
 from typing import List
 
+from src.optimization import rng as rngs
 from src.optimization.space import Function
 
 
 class TestOptimizer:
-    def __init__(self, fun: Function):
+    def __init__(self, fun: Function, rng: rngs.Seed = None):
         self.fun: Function = fun
+        self.rng = rngs.generator(rng)
     def nextPoint(self) -> List[float]:
-        xy = [random.randint(*self.fun.bounds[0]), random.randint(*self.fun.bounds[1])]
+        xy = [int(self.rng.integers(math.ceil(low), math.floor(high), endpoint=True)) for low, high in self.fun.bounds[:2]]
         return xy + [self.fun(xy)]
@@ -0,0 +1,119 @@
+import time
+
+import numpy as np
+
+
+class TraceLog:
+    """Append only log of evaluations in memory mapped file of fixed size records.
+
+    File starts with header that holds number of written records, so log can be read while it is written
+    or after crash. File capacity is doubled when it is full and cut to written records on close.
+    """
+
+    MAGIC = b'EVTRACE1'
+    HEADER = 64  # Bytes reserved for header, records start after it
+    HEADER_DTYPE = np.dtype([('magic', 'S8'), ('dim', '<u8'), ('count', '<u8')])
+    PHASE_SIZE = 16
+
+    def __init__(self, path, dim, capacity=1024):
+        self.path = path
+        self.dim = dim
+        self.dtype = self.recordDtype(dim)
+        self.count = 0
+
+        with open(path, 'wb') as f:
+            f.truncate(self.HEADER + capacity * self.dtype.itemsize)
+        self.__map()
+        self.header['magic'] = self.MAGIC
+        self.header['dim'] = dim
+        self.header['count'] = 0
+
+    @classmethod
+    def open(cls, path, maxSeq=None) -> 'TraceLog':
+        """Opens existing log for appending, records after first record with sequence number above max seq are cut"""
+        header = np.fromfile(path, dtype=cls.HEADER_DTYPE, count=1)[0]
+        if header['magic'] != cls.MAGIC:
+            raise ValueError(f'File {path} is not evaluation trace')
+
+        trace = cls.__new__(cls)
+        trace.path = path
+        trace.dim = int(header['dim'])
+        trace.dtype = cls.recordDtype(trace.dim)
+        trace.__map()
+        trace.count = int(header['count'])
+        if maxSeq is not None:
+            above = np.flatnonzero(trace.records['seq'][:trace.count] > maxSeq)
+            if len(above) > 0:
+                trace.count = int(above[0])
+                trace.header['count'] = trace.count
+        return trace
+
+    @classmethod
+    def recordDtype(cls, dim) -> np.dtype:
+        return np.dtype([
+            ('seq', '<i8'),
+            ('vector', '<f8', (dim,)),
+            ('value', '<f8'),
+            ('time', '<f8'),  # Unix time of the record
+            ('phase', f'S{cls.PHASE_SIZE}'),
+        ])
+
+    @property
+    def capacity(self):
+        return len(self.records)
+
+    def __map(self):
+        self.buffer = np.memmap(self.path, dtype=np.uint8, mode='r+')
+        self.header = self.buffer[:self.HEADER_DTYPE.itemsize].view(self.HEADER_DTYPE)
+        self.records = self.buffer[self.HEADER:].view(self.dtype)
+
+    def __resize(self, capacity):
+        self.buffer.flush()
+        del self.header, self.records, self.buffer  # File can't be resized while it is mapped on all platforms
+        with open(self.path, 'r+b') as f:
+            f.truncate(self.HEADER + capacity * self.dtype.itemsize)
+
+    def reserve(self, size):
+        capacity = max(self.capacity, 1)  # Closed log can be empty
+        while capacity < self.count + size:
+            capacity *= 2
+        if capacity != self.capacity:
+            self.__resize(capacity)
+            self.__map()
+
+    def append(self, seq, vector, value, phase=''):
+        if self.count == self.capacity:
+            self.reserve(1)
+        self.records[self.count] = (seq, vector, value, time.time(), phase)
+        self.count += 1
+        self.header['count'] = self.count
+
+    def extend(self, seqs, vectors, values, phase=''):
+        """Appends batch of records with same phase and time"""
+        size = len(values)
+        self.reserve(size)
+        records = self.records[self.count:self.count + size]
+        records['seq'] = seqs
+        records['vector'] = vectors
+        records['value'] = values
+        records['time'] = time.time()
+        records['phase'] = phase
+        self.count += size
+        self.header['count'] = self.count
+
+    def flush(self):
+        self.buffer.flush()
+
+    def close(self):
+        self.__resize(self.count)
+
+    @classmethod
+    def read(cls, path) -> np.ndarray:
+        """Returns read only structured array of written records mapped directly from file"""
+        header = np.fromfile(path, dtype=cls.HEADER_DTYPE, count=1)[0]
+        if header['magic'] != cls.MAGIC:
+            raise ValueError(f'File {path} is not evaluation trace')
+        count = int(header['count'])
+        if count == 0:
+            return np.empty(0, dtype=cls.recordDtype(int(header['dim'])))
+        return np.memmap(path, dtype=cls.recordDtype(int(header['dim'])), mode='r', offset=cls.HEADER, shape=(count,))
@@ -1,30 +1,33 @@
 import math
-from random import randint, choices
 from src.math.linalg import normalizeVector, angle, pointInTriangle
 import numpy as np
 from typing import *
 
-from src.math.space import Function
+from src.optimization import checkpoint, rng as rngs
+from src.optimization.instrument import Instrument
+from src.optimization.mesh import TriangleMesh
+from src.optimization.space import Function
+from src.optimization.store import TriangleStore
 
 
 class Point:
     def __init__(self, x, y, value):
         self.vector = [x, y]
+        self.vector2D = np.array([x, y])
         self.vector3D = np.array([x, y, value])
         self.x = x
         self.y = y
         self.value = value
-        self.triangles: List[Triangle] = []
+        self.triangles: Dict[Triangle, None] = {}  # Insertion ordered set
         self.lines = []
 
     def __str__(self):
         return f'({self.x},{self.y},{self.value})'
 
     def pointDistance(self, point, onSurface):
-        if onSurface:
-            return abs(np.linalg.norm(np.array(self.vector) - np.array(point.vector)))
-        else:
-            return abs(np.linalg.norm(self.vector3D - point.vector3D))
+        # Same as np.linalg.norm without its dispatch overhead
+        diff = self.vector2D - point.vector2D if onSurface else self.vector3D - point.vector3D
+        return math.sqrt(diff.dot(diff))
 
     def vectorDistance(self, vector, onSurface):
         if onSurface:
@@ -32,9 +35,10 @@ class Point:
         else:
             return abs(np.linalg.norm(self.vector3D - vector))
 
-    def connectedTriangles(self, searchSpace, simple):
+    def connectedTriangles(self, searchSpace, simple, mesh: TriangleMesh = None):
+        triangles = list(self.triangles)
         if simple:
-            return self.triangles
+            return triangles
 
         forceSum = np.array([0., 0.])
         vector = np.array(self.vector)
@@ -50,17 +54,21 @@ class Point:
             low, high = searchSpace[i]
             ax = nextPosition[i]
             if not (low < ax < high):
-                return self.triangles
+                return triangles
 
         # Test if point is in connected triangles
         for t in self.triangles:
             p1, p2, p3 = t.points
             isIn = pointInTriangle(nextPosition, p1.vector, p2.vector, p3.vector)
             if isIn:
-                return self.triangles
+                return triangles
 
         # In which triangle is this next position?
-        queue = [self.triangles[0]]
+        if mesh is not None:
+            triInGrid = mesh.grid.locate(nextPosition, exclude=self.triangles)
+            return triangles if triInGrid is None else triangles + [triInGrid]
+
+        queue = [triangles[0]]
         queueIndex = 0
         while queueIndex < len(queue):
             triInQueue = queue[queueIndex]
@@ -69,7 +77,7 @@ class Point:
             p1, p2, p3 = triInQueue.points
             isIn = pointInTriangle(nextPosition, p1.vector, p2.vector, p3.vector)
             if isIn:
-                return self.triangles + [triInQueue]
+                return triangles + [triInQueue]
 
             for p in triInQueue.points:
                 for t in p.triangles:
@@ -77,23 +85,26 @@ class Point:
                         queue += p.triangles
 
         # raise Exception("Point is in border but I didn't find triangle... This is bad!")
-        return self.triangles
+        return triangles
 
 
 class Line:
+    __slots__ = ('points', 'sizes', 'centers')
+
     def __init__(self, p1: Point, p2: Point):
         self.points = [p1, p2]
         for p in self.points:
             p.lines.append(self)
 
+        # Lines are immutable, geometry is indexed by onSurface flag
+        self.sizes = (p1.pointDistance(p2, onSurface=False), p1.pointDistance(p2, onSurface=True))
+        self.centers = (np.mean([p.vector3D for p in self.points], axis=0), np.mean([p.vector for p in self.points], axis=0))
+
     def size(self, onSurface):
-        return self.points[0].pointDistance(self.points[1], onSurface)
+        return self.sizes[onSurface]
 
     def center(self, onSurface):
-        if onSurface:
-            return np.mean([p.vector for p in self.points], axis=0)
-        else:
-            return np.mean([p.vector3D for p in self.points], axis=0)
+        return self.centers[onSurface]
 
     def mutualPoint(self, line):
         p1 = set(self.points)
@@ -114,23 +125,28 @@ class Line:
 
 
 class Triangle:
-    def __init__(self, lines, evalDiff=10 ** 10, eval=0):
+    __slots__ = ('splited', 'lines', 'evalDiff', 'eval', 'points', '__sortedLines', '__centers', '__normal')
+
+    def __init__(self, lines, evalDiff=10 ** 10, eval=0, points: List[Point] = None):
         self.splited = False
         self.lines: List[Line] = lines
         self.evalDiff: float = abs(evalDiff)
         self.eval = eval
         self.points: List[Point] = []
 
-        # Get unique points
-        pts = set()
-        for l in self.lines:
-            for p in l.points:
-                pts.add(p)
-        self.points += list(pts)
+        # Get unique points in order of lines, order of points can be given when triangle is restored
+        if points is None:
+            points = list({p: None for l in self.lines for p in l.points})
+        self.points += points
 
         # Add triangle to points lists
         for p in self.points:
-            p.triangles.append(self)
+            p.triangles[self] = None
+
+        # Triangles are immutable, geometry is computed once and indexed by onSurface flag
+        self.__sortedLines = tuple(sorted(self.lines, key=lambda l: abs(l.size(onSurface)), reverse=True) for onSurface in [False, True])
+        self.__centers = (np.mean([p.vector3D for p in self.points], axis=0), np.mean([np.array(p.vector) for p in self.points], axis=0))
+        self.__normal = self.__normalVector() if len(self.points) == 3 else None
 
     def __str__(self):
         return f'TRI[cen={self.center()}, eval={self.eval}, evalDiff={self.evalDiff}]'
@@ -144,15 +160,19 @@ class Triangle:
 
     def normalVector(self):
         """Returns normal vector which is turned upward"""
+        return self.__normal
+
+    def __normalVector(self):
         v1 = self.points[0].vector3D
         v2 = self.points[1].vector3D
         v3 = self.points[2].vector3D
-        dv1 = v2 - v1
-        dv2 = v3 - v1
-        normal1 = np.cross(dv1, dv2)
+        (x1, y1, z1), (x2, y2, z2) = (v2 - v1).tolist(), (v3 - v1).tolist()
+
+        # Cross product of 3 element vectors, np.cross is slow on small arrays
+        normal1 = [y1 * z2 - z1 * y2, z1 * x2 - x1 * z2, x1 * y2 - y1 * x2]
         if normal1[-1] < 0:
-            normal1 = np.cross(dv2, dv1)
-        return normal1 / 2
+            normal1 = [y2 * z1 - z2 * y1, z2 * x1 - x2 * z1, x2 * y1 - y2 * x1]
+        return np.array(normal1) / 2
 
     def fractureRatio(self):
         deg = []
@@ -165,11 +185,12 @@ class Triangle:
         return abs((A.x * (B.y - C.y) + B.x * (C.y - A.y) + C.x * (A.y - B.y)) / 2)
 
     def sortedLines(self, onSurface, fromBigToLow=True):
-        return sorted(self.lines, key=lambda l: abs(l.size(onSurface)), reverse=fromBigToLow)
+        if fromBigToLow:
+            return list(self.__sortedLines[onSurface])
+        return sorted(self.lines, key=lambda l: abs(l.size(onSurface)), reverse=False)
 
     def biggestLineSize(self, onSurface):
-        bigestLine = self.sortedLines(onSurface, fromBigToLow=True)[0]
-        return bigestLine.size(onSurface)
+        return self.__sortedLines[onSurface][0].size(onSurface)
 
     def coincidingTriangles(self, onSurface, searchSpace, simple):
         tri = []
@@ -187,29 +208,66 @@ class Triangle:
 
         return tri
 
-    def connectedTriangles(self, searchSpace, simple):
+    def connectedTriangles(self, searchSpace, simple, mesh: TriangleMesh = None):
         tri: List[Triangle] = []
         for p in self.points:
-            for t in p.connectedTriangles(searchSpace, simple):
+            for t in p.connectedTriangles(searchSpace, simple, mesh):
                 if t != self and t not in tri:
                     tri.append(t)
         return tri
 
     def newPointVector(self, onSurface):
-        bigestLine = self.sortedLines(onSurface, fromBigToLow=True)[0]
-        return bigestLine.center(onSurface)
+        return self.__sortedLines[onSurface][0].center(onSurface)
 
     def center(self, onSurface):
-        if onSurface:
-            return np.mean([np.array(p.vector) for p in self.points], axis=0)
-        return np.mean([p.vector3D for p in self.points], axis=0)
+        return self.__centers[onSurface]
+
+
+class PointGrid:
+    """Uniform grid hash of points for fixed radius near point queries"""
+
+    def __init__(self, radius):
+        self.radius = radius
+        self.cells: Dict[Tuple[int, int], List[Point]] = {}
+
+    def cell(self, point: Point):
+        return math.floor(point.x / self.radius), math.floor(point.y / self.radius)
+
+    def isNear(self, point: Point):
+        """Tells if any point in grid is closer than radius"""
+        cx, cy = self.cell(point)
+        for x in range(cx - 1, cx + 2):
+            for y in range(cy - 1, cy + 2):
+                for p in self.cells.get((x, y), []):
+                    if p.pointDistance(point, onSurface=True) < self.radius:
+                        return True
+        return False
+
+    def add(self, point: Point):
+        self.cells.setdefault(self.cell(point), []).append(point)
 
 
 class TriangleOptimizer:
-    def __init__(self, space: Function, maxEval):
+    # Methods timed by instrument, wrappers are set on instance so optimizer without instrument pays nothing
+    TIMED = {
+        'evaluate': 'objective',
+        'partition': 'partition',
+        'getBestRankedTriangle': 'ranking',
+        'addMinConnectedTrianglesToQueue': 'minimums',
+    }
+
+    def __init__(self, space: Function, maxEval, instrument: Instrument = None, rng: rngs.Seed = None, init=True):
         self.space = space
-        self.triangles: List[Triangle] = []
+        self.rng = rngs.generator(rng)
+        self.mesh = TriangleMesh()
+        self.ranks = TriangleStore()  # Ranking attributes of triangles
+
+        # INCREMENTAL MINIMUMS
+        self.lowestPoints: Dict[Triangle, Point] = {}
+        self.lowestTriangles: Dict[Triangle, None] = {}  # Triangles with lowest point lower than connected triangles
+        self.smallTriangles: Dict[float, Dict[Triangle, None]] = {}  # Max line size -> smaller triangles in creation order
         self.points: List[Point] = []
+        self.pointsIndex: Dict[Tuple[float, float], Point] = {}  # Exact (x, y) -> point
 
         self.queue_borderPoints: List[Point] = []
         self.queue_cheepTriangles: List[Triangle] = []
@@ -225,12 +283,30 @@ class TriangleOptimizer:
         self.evalMax = maxEval
         self.evaluation = 0
 
-        self.init()
+        self.maxLocalMinLineSize = None
+        self.maxGlobalMinLineSize = None
+
+        # Checkpoint restores triangles instead of creating them and evaluating their corners
+        if init:
+            self.init()
+
+        self.instrument: Instrument = None
+        self.setInstrument(instrument)
+
+    def setInstrument(self, instrument: Instrument = None):
+        self.instrument = instrument
+        for method, timer in self.TIMED.items():
+            self.__dict__.pop(method, None)
+            if instrument is not None:
+                setattr(self, method, instrument.timed(timer, getattr(self, method)))
 
-        self.maxLocalMinLineSize = self.triangles[0].biggestLineSize(onSurface=True) * 5 * 10 ** -4
-        self.maxGlobalMinLineSize = self.triangles[0].biggestLineSize(onSurface=True) * 10 ** -6
+    @property
+    def triangles(self) -> Dict[Triangle, int]:
+        """Live triangles in order of creation"""
+        return self.mesh.triangles
 
     def init(self):
+        self.space.phase = 'init'
         leftdown, _ = self.getOrMakePoint(self.space.bounds[0][0], self.space.bounds[1][0])
         leftup, _ = self.getOrMakePoint(self.space.bounds[0][0], self.space.bounds[1][1])
         rightdown, _ = self.getOrMakePoint(self.space.bounds[0][1], self.space.bounds[1][0])
@@ -245,29 +321,154 @@ class TriangleOptimizer:
             Line(leftup, rightup),
             Line(rightup, rightdown),
         ]
-        self.triangles += [
+        self.addTriangles([
             Triangle(lines[:3]),
             Triangle(lines[2:])
-        ]
+        ])
+        self.updateMinimums(self.queue_borderPoints)
+
+        firstTriangle = next(iter(self.triangles))
+        self.maxLocalMinLineSize = firstTriangle.biggestLineSize(onSurface=True) * 5 * 10 ** -4
+        self.maxGlobalMinLineSize = firstTriangle.biggestLineSize(onSurface=True) * 10 ** -6
+
+    def save(self, path):
+        """Writes triangle graph, queues and generator state to binary checkpoint"""
+        pointIds = {p: i for i, p in enumerate(self.points)}
+        lines = list({l: None for p in self.points for l in p.lines})
+        lineIds = {l: i for i, l in enumerate(lines)}
+        queued = self.queue_cheepTriangles + self.queue_minConnectedTriangles
+        triangles = list(dict.fromkeys(list(self.triangles) + queued))
+        triangleIds = {t: i for i, t in enumerate(triangles)}
+
+        arrays = {
+            'points': np.array([[p.x, p.y, p.value] for p in self.points], dtype=float).reshape(-1, 3),
+            'lines': np.array([[pointIds[p] for p in l.points] for l in lines], dtype=np.int64).reshape(-1, 2),
+            'triangles_evalDiff': np.array([t.evalDiff for t in triangles], dtype=float),
+            'triangles_eval': np.array([t.eval for t in triangles], dtype=np.int64),
+            'triangles_splited': np.array([t.splited for t in triangles], dtype=bool),
+            'live': np.array([triangleIds[t] for t in self.triangles], dtype=np.int64),
+            'midpoints': np.array([sorted(pointIds[p] for p in edge) + [pointIds[midpoint]] for edge, midpoint in self.mesh.midpoints.items()], dtype=np.int64).reshape(-1, 3),
+            'queue_borderPoints': np.array([pointIds[p] for p in self.queue_borderPoints], dtype=np.int64),
+            'queue_cheepTriangles': np.array([triangleIds[t] for t in self.queue_cheepTriangles], dtype=np.int64),
+            'queue_minConnectedTriangles': np.array([triangleIds[t] for t in self.queue_minConnectedTriangles], dtype=np.int64),
+        }
+        arrays['triangles_lines_offsets'], arrays['triangles_lines'] = checkpoint.packLists([[lineIds[l] for l in t.lines] for t in triangles])
+        arrays['triangles_points_offsets'], arrays['triangles_points'] = checkpoint.packLists([[pointIds[p] for p in t.points] for t in triangles])
+        arrays['points_lines_offsets'], arrays['points_lines'] = checkpoint.packLists([[lineIds[l] for l in p.lines] for p in self.points])
+        arrays['points_triangles_offsets'], arrays['points_triangles'] = checkpoint.packLists([[triangleIds[t] for t in p.triangles] for p in self.points])
+
+        checkpoint.write(path, {
+            'bounds': self.space.bounds,
+            'evalMax': self.evalMax,
+            'evaluation': self.evaluation,
+            'spaceEvaluation': self.space.evaluation,
+            'searchChoice': self.searchChoice,
+            'maxLocalMinLineSize': self.maxLocalMinLineSize,
+            'maxGlobalMinLineSize': self.maxGlobalMinLineSize,
+            'rng': rngs.getState(self.rng),
+        }, arrays)
+
+    @classmethod
+    def load(cls, path, space: Function, instrument: Instrument = None):
+        """Restores optimizer from checkpoint writen with save, no point is evaluated again"""
+        index, arrays = checkpoint.read(path)
+        opt = cls(space, index['evalMax'], instrument, rng=rngs.fromState(index['rng']), init=False)
+        opt.space.bounds = index['bounds']
+        opt.space.evaluation = index['spaceEvaluation']
+
+        points = [Point(x, y, value) for x, y, value in arrays['points'].tolist()]
+        lines = [Line(points[i], points[j]) for i, j in arrays['lines'].tolist()]
+        triangleLines = checkpoint.unpackLists(arrays['triangles_lines_offsets'], arrays['triangles_lines'])
+        trianglePoints = checkpoint.unpackLists(arrays['triangles_points_offsets'], arrays['triangles_points'])
+        triangles = []
+        for lineIds, pointIds, evalDiff, eval, splited in zip(triangleLines, trianglePoints, arrays['triangles_evalDiff'].tolist(),
+                                                              arrays['triangles_eval'].tolist(), arrays['triangles_splited'].tolist()):
+            t = Triangle([lines[i] for i in lineIds], evalDiff=evalDiff, eval=eval, points=[points[i] for i in pointIds])
+            t.splited = splited
+            triangles.append(t)
+
+        # Constructors appended lines and triangles to points, order of points lists is restored from checkpoint
+        pointsLines = checkpoint.unpackLists(arrays['points_lines_offsets'], arrays['points_lines'])
+        pointsTriangles = checkpoint.unpackLists(arrays['points_triangles_offsets'], arrays['points_triangles'])
+        for p, lineIds, triangleIds in zip(points, pointsLines, pointsTriangles):
+            p.lines = [lines[i] for i in lineIds]
+            p.triangles = dict.fromkeys(triangles[i] for i in triangleIds)
+
+        opt.points = points
+        opt.pointsIndex = {(p.x, p.y): p for p in points}
+        for p1, p2, midpoint in arrays['midpoints'].tolist():
+            opt.mesh.split(points[p1], points[p2], points[midpoint])
+        opt.addTriangles([triangles[i] for i in arrays['live'].tolist()])
+        opt.updateMinimums(points)
+        opt.queue_borderPoints = [points[i] for i in arrays['queue_borderPoints'].tolist()]
+        opt.queue_cheepTriangles = [triangles[i] for i in arrays['queue_cheepTriangles'].tolist()]
+        opt.queue_minConnectedTriangles = [triangles[i] for i in arrays['queue_minConnectedTriangles'].tolist()]
+
+        opt.searchChoice = index['searchChoice']
+        opt.evaluation = index['evaluation']
+        opt.maxLocalMinLineSize = index['maxLocalMinLineSize']
+        opt.maxGlobalMinLineSize = index['maxGlobalMinLineSize']
+        return opt
+
+    def addTriangles(self, triangles: List[Triangle]):
+        for t in triangles:
+            self.mesh.add(t)
+            self.ranks.add(t, t.evalDiff, t.meanValue(), t.eval)
+            self.lowestPoints[t] = t.lowestPoint()
+            for maxLineSize, small in self.smallTriangles.items():
+                if t.biggestLineSize(onSurface=True) < maxLineSize:
+                    small[t] = None
+
+    def removeTriangle(self, triangle: Triangle):
+        self.mesh.remove(triangle)
+        self.ranks.remove(triangle)
+        del self.lowestPoints[triangle]
+        self.lowestTriangles.pop(triangle, None)
+        for small in self.smallTriangles.values():
+            small.pop(triangle, None)
+
+    def updateMinimums(self, points: List[Point]):
+        """Updates lowest triangles among triangles connected to points, only they can see changed neighbours"""
+        for t in {t: None for p in points for t in p.triangles}:
+            lowValue = self.lowestPoints[t].value
+            if all(lowValue <= self.lowestPoints[tc].value for p in t.points for tc in p.triangles):
+                self.lowestTriangles[t] = None
+            else:
+                self.lowestTriangles.pop(t, None)
+
+    def getSmallTriangles(self, maxLineSize) -> Dict[Triangle, None]:
+        if maxLineSize not in self.smallTriangles:
+            self.smallTriangles[maxLineSize] = {t: None for t in self.triangles if t.biggestLineSize(onSurface=True) < maxLineSize}
+        return self.smallTriangles[maxLineSize]
 
     def pointExists(self, x, y):
-        for p in self.points:
-            if p.vector == [x, y]:
-                return True
-        return False
+        return (x, y) in self.pointsIndex
 
     def getOrMakePoint(self, x, y):
-        for p in self.points:
-            if p.vector == [x, y]:
-                return p, "get"
+        p = self.pointsIndex.get((x, y))
+        if p is not None:
+            return p, "get"
 
-        p = Point(x, y, self.space([x, y]))
+        p = Point(x, y, self.evaluate([x, y]))
         self.points.append(p)
+        self.pointsIndex[(x, y)] = p
         return p, "make"
 
-    def nextPoint(self):
-        print(f'EVAL: {self.evaluation}')
+    def evaluate(self, vector):
+        return self.space(vector)
 
+    def nextPoint(self):
+        vector = self.__nextPoint()
+        if self.instrument is not None:
+            self.instrument.gauge('evaluation', self.evaluation)
+            self.instrument.gauge('triangles', len(self.triangles))
+            self.instrument.gauge('queue_borderPoints', len(self.queue_borderPoints))
+            self.instrument.gauge('queue_cheepTriangles', len(self.queue_cheepTriangles))
+            self.instrument.gauge('queue_minConnectedTriangles', len(self.queue_minConnectedTriangles))
+            self.instrument.endStep()
+        return vector
+
+    def __nextPoint(self):
         # Return border points on start
         if len(self.queue_borderPoints) > 0:
             point = self.queue_borderPoints[0]
@@ -282,22 +483,29 @@ class TriangleOptimizer:
             point, cmd = self.partition(triangle)
             if cmd == 'make':
                 raise Exception("ERR")
+            if self.instrument is not None:
+                self.instrument.count('cheepPartitions')
 
         # Return triangles connected to local minimums
         while len(self.queue_minConnectedTriangles) > 0:
             triangle = self.queue_minConnectedTriangles[0]
             self.queue_minConnectedTriangles.pop(0)
             if not triangle.splited:
+                self.space.phase = 'min_connected'
                 point, cmd = self.partition(triangle)
                 if cmd == 'get':
                     raise Exception("ERR")
                 self.evaluation += 1
                 return point.vector3D
 
-        searchChoice = choices(list(self.searchChoice.keys()), weights=list(self.searchChoice.values()))[0]
+        weights = np.array(list(self.searchChoice.values()))
+        searchChoice = list(self.searchChoice.keys())[self.rng.choice(len(weights), p=weights / weights.sum())]
+        if self.instrument is not None:
+            self.instrument.count(searchChoice)
 
         # Explore space
         if searchChoice == 'search_best_tri':
+            self.space.phase = searchChoice
             triangle = self.getBestRankedTriangle()
             point, cmd = self.partition(triangle)
             if cmd == 'get':
@@ -306,10 +514,10 @@ class TriangleOptimizer:
             return point.vector3D
         elif searchChoice == 'search_local_min':
             self.addMinConnectedTrianglesToQueue(self.maxLocalMinLineSize)
-            return self.nextPoint()
+            return self.__nextPoint()
         elif searchChoice == 'search_global_min':
             self.addMinConnectedTrianglesToQueue(self.maxGlobalMinLineSize)
-            return self.nextPoint()
+            return self.__nextPoint()
 
     def addMinConnectedTrianglesToQueue(self, maxLineSize):
         activeMins, unactiveMins = self.getMinimums(maxLineSize)
@@ -317,63 +525,36 @@ class TriangleOptimizer:
         # Add lowest point triangles to queue list.
         if len(activeMins) > 0:
             bestMinimum = activeMins[0]
-            triangles = bestMinimum.connectedTriangles(self.space.bounds, simple=False)
+            triangles = bestMinimum.connectedTriangles(self.space.bounds, simple=False, mesh=self.mesh)
             for t in triangles:
                 if t not in self.queue_minConnectedTriangles:
                     self.queue_minConnectedTriangles.append(t)
 
     def getBestRankedTriangle(self):
-        maxEval = randint(8, 14)
-        while True:
-            triangles = [t for t in self.triangles if t.eval < maxEval]
-            if len(triangles) > 0:
-                break
-            maxEval += 1
-
-        info = {'evalDiff': [], 'meanValue': [], 'eval': []}
-        for t in triangles:
-            info['evalDiff'].append(t.evalDiff)
-            info['meanValue'].append(t.meanValue())
-            info['eval'].append(t.eval)
-
-        highEvalDiff = normalizeVector(info['evalDiff'])
-        lowEval = 1 - normalizeVector(info['eval'])
-        lowValue = 1 - normalizeVector(info['meanValue'])
-
-        rank = highEvalDiff + lowEval + 3 * lowValue
-
-        bestRank = np.argsort(rank)[-1]
-        return triangles[bestRank]
+        return self.ranks.bestRanked(maxEval=self.rng.integers(8, 14, endpoint=True))
 
     def getMinimums(self, maxLineSizeOfConnectedTriangle):
-        activeMinimums = []
+        smallTriangles = self.getSmallTriangles(maxLineSizeOfConnectedTriangle)
+
+        # Lowest points of small triangles, near points are merged
         unactiveMinimums = []
-        for t in self.triangles:
-            lowPoint = t.lowestPoint()
-            if t.biggestLineSize(onSurface=True) < maxLineSizeOfConnectedTriangle:
-                isNewMin = True
-                for umin in unactiveMinimums:
-                    if umin.pointDistance(lowPoint, onSurface=True) < maxLineSizeOfConnectedTriangle * 2:
-                        isNewMin = False
-                        break
-                if isNewMin:
-                    unactiveMinimums.append(lowPoint)
+        grid = PointGrid(maxLineSizeOfConnectedTriangle * 2)
+        for t in smallTriangles:
+            lowPoint = self.lowestPoints[t]
+            if not grid.isNear(lowPoint):
+                grid.add(lowPoint)
+                unactiveMinimums.append(lowPoint)
+
+        # Lowest points of bigger triangles that are lower than connected triangles, in order of creation
+        activeMinimums = []
+        grid = PointGrid(maxLineSizeOfConnectedTriangle)
+        for t in sorted(self.lowestTriangles, key=self.ranks.slots.get):
+            if t in smallTriangles:
                 continue
-
-            isLowest = True
-            for tc in t.connectedTriangles(self.space.bounds, simple=True):
-                if lowPoint.value > tc.lowestPoint().value:
-                    isLowest = False
-                    break
-
-            if isLowest:
-                isNewMin = True
-                for amin in activeMinimums:
-                    if lowPoint.pointDistance(amin, onSurface=True) < maxLineSizeOfConnectedTriangle:
-                        isNewMin = False
-                        break
-                if isNewMin:
-                    activeMinimums.append(lowPoint)
+            lowPoint = self.lowestPoints[t]
+            if not grid.isNear(lowPoint):
+                grid.add(lowPoint)
+                activeMinimums.append(lowPoint)
 
         return sorted(activeMinimums, key=lambda p: p.value, reverse=False), unactiveMinimums
 
@@ -383,9 +564,9 @@ class TriangleOptimizer:
             if triangle in self.queue_cheepTriangles:
                 raise Exception(f"Triangle emerge multiple times in queue list, but is allready splited!")
             triangle.splited = True
-            self.triangles.remove(triangle)
+            self.removeTriangle(triangle)
             for p in triangle.points:
-                p.triangles.remove(triangle)
+                del p.triangles[triangle]
         # If triangle is allready splited he was added to self.queue list multiple times!
         else:
             raise Exception("Triangle was allready splited")
@@ -394,6 +575,7 @@ class TriangleOptimizer:
         line0, line1, line2 = triangle.sortedLines(onSurface=True, fromBigToLow=True)
         mX, mY, mVal = line0.center(onSurface=False)
         mPoint, cmd = self.getOrMakePoint(mX, mY)
+        self.mesh.split(*line0.points, mPoint)
         evalDiff = mPoint.value - mVal
 
         # Get other 3 points
@@ -415,11 +597,11 @@ class TriangleOptimizer:
         ]
 
         # Add new triangles to the mix
-        self.triangles += newTriangles
+        self.addTriangles(newTriangles)
+        self.updateMinimums(triangle.points + [mPoint])
 
         # Partition connected triangles and new triangles if no point will be created in the process of partitioning
-        for t in triangle.coincidingTriangles(onSurface=True, searchSpace=self.space.bounds,
-                                              simple=True) + newTriangles:
+        for t in self.mesh.coincidingTriangles(triangle) + newTriangles:
             if t not in self.queue_cheepTriangles:
                 NmX, NmY = t.newPointVector(onSurface=True)
                 if self.pointExists(NmX, NmY):
@@ -0,0 +1,53 @@
+import io
+import tempfile
+import unittest
+
+from src import benchmark
+
+
+class Test_benchmark(unittest.TestCase):
+    def setUp(self):
+        # Registry cache is built in temporary directory, so tests don't write to data cache of repository
+        cacheDir = tempfile.TemporaryDirectory()
+        self.addCleanup(cacheDir.cleanup)
+        self.cacheDir = cacheDir.name
+
+    def test_jobs(self):
+        jobs = benchmark.jobs(list(benchmark.OPTIMIZERS), ['Rana', 'Hartmann3'], seeds=2, cacheDir=self.cacheDir)
+        runs = sorted((job['optimizer'], job['function'], job['seedIndex']) for job in jobs)
+
+        # Only KD tree optimizer supports more than 2 dimensions, it doesn't use seed so it runs once on not shifted bounds
+        self.assertEqual(runs, sorted(
+            [('KDTreeOptimizer', 'Hartmann3', 0), ('KDTreeOptimizer', 'Rana', 0)] +
+            [(optimizer, 'Rana', i) for optimizer in ['TriangleOptimizer', 'TestOptimizer'] for i in range(2)]
+        ))
+        shifted = benchmark.jobs(['KDTreeOptimizer'], ['Hartmann3'], seeds=2, shift=True, cacheDir=self.cacheDir)
+        self.assertEqual([job['seedIndex'] for job in shifted], [0, 1])
+
+    def test_runJob(self):
+        job = benchmark.jobs(['TestOptimizer'], ['Rana'], seeds=2, maxEval=50, tolerance=1e6, cacheDir=self.cacheDir)[1]
+        row = benchmark.runJob(job)
+
+        self.assertEqual(row, {**benchmark.runJob(job), 'wallTime': row['wallTime'], 'peakRssGrowthKb': row['peakRssGrowthKb']})
+        self.assertEqual((row['status'], row['evaluations'], row['evaluationsToTolerance'], row['seed']), ('ok', 50, 1, 1))
+        self.assertAlmostEqual(row['finalError'], row['bestValue'] - row['fglob'])
+
+    def test_runJob_highDimensions(self):
+        job = benchmark.jobs(['KDTreeOptimizer'], ['Cola'], seeds=1, maxEval=300, cacheDir=self.cacheDir)[0]
+        row = benchmark.runJob(job)
+        self.assertEqual((row['status'], row['evaluations'], row['dimensions']), ('ok', 300, 17))
+
+        row = benchmark.runJob({**job, 'timeout': 0})
+        self.assertEqual((row['status'], row['evaluations']), ('timeout', 0))
+
+    def test_run(self):
+        output = io.StringIO()
+        benchmark.run(benchmark.jobs(['KDTreeOptimizer'], ['Rana'], seeds=1, maxEval=20, cacheDir=self.cacheDir), output, workers=1)
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0].split(','), benchmark.COLUMNS)
+        self.assertEqual(len(lines), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from libs.go_benchmark_functions import Rastrigin
+from src.optimization.engine import ProcessPoolEngine
+from src.optimization.kdtree import KDTreeOptimizer
+from src.optimization.latency import Latency
+from src.optimization.space import Function
+
+
+class FlakyFunction(Function):
+    """Function whose every n-th evaluation in worker process fails"""
+
+    def __init__(self, f, failEvery):
+        super().__init__(f)
+        self.failEvery = failEvery
+        self.calls = 0
+
+    def evaluate(self, vector):
+        self.calls += 1
+        if self.calls % self.failEvery == 0:
+            raise RuntimeError("Evaluation failed!")
+        return super().evaluate(vector)
+
+
+class Test_ProcessPoolEngine(unittest.TestCase):
+    def test_run(self):
+        fun = FlakyFunction(Rastrigin, failEvery=3)
+        opt = KDTreeOptimizer(fun, fun.bounds, maxGeneration=30)
+        evaluated = []
+        engine = ProcessPoolEngine(fun, opt, maxWorkers=2, maxEval=80, maxRetries=100)
+        engine.run(callback=evaluated.append)
+
+        self.assertGreater(engine.failures, 0)
+        self.assertEqual(fun.evaluation, 80)
+        self.assertEqual(len(evaluated), 80)
+        self.assertEqual(len(opt.pendingPoints), 0)
+        self.assertTrue(all(point.value is not None and point.value != float('inf') for point in evaluated))
+
+    def test_failureValue(self):
+        fun = FlakyFunction(Rastrigin, failEvery=1)
+        opt = KDTreeOptimizer(fun, fun.bounds, maxGeneration=30)
+        evaluated = []
+        engine = ProcessPoolEngine(fun, opt, maxWorkers=2, maxEval=10, maxRetries=1, failureValue=100.)
+        engine.run(callback=evaluated.append)
+
+        self.assertEqual(engine.failures, 20)
+        self.assertEqual(fun.evaluation, 10)
+        self.assertEqual([point.value for point in evaluated], [100.] * 10)
+        self.assertEqual(len(opt.pendingPoints), 0)
+
+    def test_reproducibleLatency(self):
+        runs = []
+        for i in range(2):
+            fun = Function(Rastrigin, rng=0)
+            fun.setLatency(Latency(scale=0, failureRate=0.3, rng=1))
+            engine = ProcessPoolEngine(fun, KDTreeOptimizer(fun, fun.bounds, maxGeneration=30), maxWorkers=1, maxEval=40)
+            engine.run()
+            runs.append(engine.failures)
+
+        self.assertEqual(runs[0], runs[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
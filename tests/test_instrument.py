@@ -0,0 +1,41 @@
+import time
+import unittest
+
+from src.optimization.instrument import Instrument
+
+
+class Test_Instrument(unittest.TestCase):
+    def test_exclusiveTimings(self):
+        instrument = Instrument(sink=None)
+        with instrument.time('outer'):
+            with instrument.time('inner'):
+                time.sleep(0.02)
+
+        self.assertGreaterEqual(instrument.timings['inner'], 0.02)
+        self.assertLess(instrument.timings['outer'], 0.01)
+        self.assertEqual(instrument.counters, {'outer': 1, 'inner': 1})
+
+    def test_sampling(self):
+        records = []
+        instrument = Instrument(sink=records.append, every=3)
+        fun = instrument.timed('fun', lambda x: x + 1)
+        for i in range(7):
+            self.assertEqual(fun(i), i + 1)
+            instrument.gauge('i', i)
+            instrument.endStep()
+
+        self.assertEqual([r['step'] for r in records], [3, 6])
+        self.assertEqual(records[-1]['counters'], {'fun': 6})
+        self.assertEqual(records[-1]['gauges'], {'i': 5})
+
+    def test_noSink(self):
+        instrument = Instrument()
+        instrument.count('step')
+        instrument.endStep()
+
+        self.assertEqual(instrument.record()['step'], 1)
+        self.assertEqual(instrument.counters, {'step': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
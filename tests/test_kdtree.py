@@ -0,0 +1,180 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.optimization.heap import IndexedHeap
+from libs.go_benchmark_functions import Rastrigin
+from src.optimization.kdtree import Cube, KDTreeOptimizer, EVENT
+from src.optimization.store import IdRows
+from src.optimization.space import Function
+from src.optimization.trace import TraceLog
+
+
+def paraboloid(vector):
+    return sum((np.array(vector) - 0.3) ** 2)
+
+
+class Test_IndexedHeap(unittest.TestCase):
+    def test_updateAndRemove(self):
+        heap = IndexedHeap()
+        heap.push(0, 3.)
+        heap.push(1, 1.)
+        heap.push(2, 2.)
+        heap.push(1, 4.)
+        heap.remove(2)
+
+        self.assertEqual(len(heap), 2)
+        self.assertNotIn(2, heap)
+        self.assertEqual(heap.pop(), (0, 3.))
+        self.assertEqual(heap.pop(), (1, 4.))
+
+    def test_sharedPositions(self):
+        heaps = [IndexedHeap(), IndexedHeap()]
+        heaps[1].positions = heaps[0].positions
+        for item in range(10):
+            heaps[item % 2].push(item, float(item // 4))
+
+        # Equal keys are ordered by item
+        self.assertEqual([heaps[0].pop() for i in range(5)], [(0, 0.), (2, 0.), (4, 1.), (6, 1.), (8, 2.)])
+        self.assertNotIn(3, heaps[0])
+        self.assertIn(3, heaps[1])
+
+
+class Test_IdRows(unittest.TestCase):
+    def test_rows(self):
+        rows = IdRows(rows=2, capacity=4)
+        rows.reserve(3)
+        rows.set(0, [1, 2])
+        for id in range(10):
+            rows.append(1, id)
+        rows.extend(2, [7, 8, 9])
+        rows.remove(1, 3)
+        rows.replace(2, 8, [3, 4])
+        rows.clear(0)
+        rows.append(0, 5)
+
+        self.assertEqual([rows[row].tolist() for row in range(3)], [[5], [0, 1, 2, 4, 5, 6, 7, 8, 9], [7, 3, 9, 4]])
+        offsets, ids = rows.arrays(3)
+        self.assertEqual(offsets.tolist(), [0, 1, 10, 14])
+        restored = IdRows.fromArrays(offsets, ids)
+        self.assertEqual([restored[row].tolist() for row in range(3)], [rows[row].tolist() for row in range(3)])
+        self.assertRaises(Exception, rows.remove, 2, 8)
+
+
+class Test_Cube(unittest.TestCase):
+    def setUp(self):
+        self.cube = Cube([[0, 1], [0, 1]])
+        self.cube.generation = 0
+
+    def test_attributes(self):
+        self.assertEqual(self.cube.bounds, [[0, 1], [0, 1]])
+        self.assertEqual(self.cube.centralPoint.center, [.5, .5])
+        self.assertEqual(self.cube.volume, 1)
+
+    def test_partition(self):
+        children = self.cube.partition()
+
+        self.assertTrue(self.cube.disconnected)
+        self.assertEqual([c.bounds for c in children], [
+            [[0, .5], [0, .5]],
+            [[0, .5], [.5, 1]],
+            [[.5, 1], [0, .5]],
+            [[.5, 1], [.5, 1]],
+        ])
+        for child in children:
+            self.assertEqual(child.generation, 1)
+            self.assertEqual(len(child.adjacentCubes), 2)
+            self.assertEqual(child.parentsPoints, [self.cube.centralPoint])
+
+    def test_partition_neighbours(self):
+        children = self.cube.partition()
+        grandChildren = children[0].partition()
+
+        # Upper left child shares faces with upper grand children, upper right child touches last grand child only in corner
+        self.assertEqual(set(children[1].adjacentCubes), {children[3], grandChildren[1], grandChildren[3]})
+        self.assertEqual(set(children[3].adjacentCubes), {children[1], children[2]})
+        for cube in children[1:] + grandChildren:
+            for adjacentCube in cube.adjacentCubes:
+                self.assertIn(cube, adjacentCube.adjacentCubes)
+
+    def test_partition_neighbours3D(self):
+        cube = Cube([[0, 1], [0, 1], [0, 1]])
+        cube.generation = 0
+        children = cube.partition()
+        grandChildren = children[1].partition()
+
+        # Grand child has 3 siblings and cubes across its faces on the border of partitioned child
+        self.assertEqual([len(c.adjacentCubes) for c in grandChildren], [4, 3, 5, 4, 5, 4, 6, 5])
+        self.assertEqual(set(grandChildren[7].adjacentCubes) - set(grandChildren), {children[3], children[5]})
+
+    def test_partition_axes(self):
+        children = self.cube.partition(axes=[1])
+
+        self.assertEqual([c.bounds for c in children], [[[0, 1], [0, .5]], [[0, 1], [.5, 1]]])
+        self.assertEqual(children[0].longestAxes(1), [0])
+
+
+class Test_KDTreeOptimizer(unittest.TestCase):
+    def test_askTell(self):
+        opt = KDTreeOptimizer(paraboloid, [[0, 1], [0, 1]], maxGeneration=8)
+        for i in range(60):
+            points = opt.ask(4)
+            self.assertTrue(0 < len(points) <= 4)
+            opt.tell(points, [paraboloid(p.center) for p in points])
+
+        self.assertEqual(len(opt.pendingPoints), 0)
+        self.assertLess(opt.globalMin.value, 10 ** -3)
+
+    def test_nextPoint(self):
+        events = []
+        opt = KDTreeOptimizer(paraboloid, [[0, 1], [0, 1], [0, 1]], maxGeneration=30, splitAxes=1,
+                              listeners=[lambda event, cube: events.append(event)])
+        vectors = [opt.nextPoint() for i in range(200)]
+
+        self.assertEqual(vectors[0], [.5, .5, .5, paraboloid([.5, .5, .5])])
+        self.assertEqual(events.count(EVENT.CREATE), len(opt.points))
+        self.assertEqual(events.count(EVENT.SPLIT), len(opt.points) - len(opt.cubes))
+
+    def test_maxGeneration(self):
+        opt = KDTreeOptimizer(paraboloid, [[0, 1], [0, 1]], maxGeneration=2)
+        for i in range(21):
+            opt.nextPoint()
+
+        self.assertEqual(opt.ask(4), [])
+        self.assertRaises(Exception, opt.nextPoint)
+        self.assertEqual(len(opt.points), 21)
+
+    def test_saveLoad(self):
+        opt = KDTreeOptimizer(paraboloid, [[0, 1], [0, 1]], maxGeneration=30)
+        for i in range(100):
+            opt.nextPoint()
+
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, 'kdtree.npz')
+            opt.save(path)
+            loaded = KDTreeOptimizer.load(path, paraboloid)
+
+        self.assertEqual(loaded.globalMin.vector, opt.globalMin.vector)
+        self.assertEqual([c.bounds for c in loaded.cubes], [c.bounds for c in opt.cubes])
+        self.assertEqual([loaded.nextPoint() for i in range(100)], [opt.nextPoint() for i in range(100)])
+
+    def test_phase(self):
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, 'run.trace')
+            fun = Function(Rastrigin, rng=0)
+            fun.setTrace(TraceLog(path, 2))
+            opt = KDTreeOptimizer(fun, fun.bounds, maxGeneration=30)
+            for i in range(100):
+                opt.nextPoint()
+            fun.trace.close()
+
+            phases = TraceLog.read(path)['phase'].tolist()
+            self.assertEqual(phases[:5], [b'init'] * 5)
+            self.assertLessEqual({b'local_min', b'most_connected'}, set(phases[5:]))
+            self.assertLessEqual(set(phases[5:]), {b'local_min', b'most_connected', b'min_point'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+
+from libs.go_benchmark_functions import Rastrigin
+from src.optimization.latency import Latency, EvaluationFailure, EvaluationTimeout
+from src.optimization.space import Function
+
+
+class Test_Latency(unittest.TestCase):
+    def test_distributions(self):
+        for distribution in Latency.DISTRIBUTIONS:
+            sleeps = []
+            latency = Latency(distribution, scale=0.5, rng=0, sleep=sleeps.append)
+            for _ in range(2000):
+                latency(abs, -1)
+
+            self.assertEqual(len(sleeps), 2000)
+            self.assertAlmostEqual(latency.totalDelay, sum(sleeps))
+            self.assertGreaterEqual(min(sleeps), 0.5 if distribution != 'lognormal' else 0)
+            self.assertAlmostEqual(np.median(sleeps), 0.5 if distribution != 'heavyTailed' else 0.5 * 2 ** (1 / 1.5), delta=0.05)
+
+    def test_injection(self):
+        sleeps = []
+        latency = Latency(scale=1, failureRate=0.2, timeoutRate=0.1, timeout=3, rng=0, sleep=sleeps.append)
+        results = {'ok': 0, 'failure': 0, 'timeout': 0}
+        for _ in range(1000):
+            try:
+                latency(abs, -1)
+                results['ok'] += 1
+            except EvaluationFailure:
+                results['failure'] += 1
+            except EvaluationTimeout:
+                results['timeout'] += 1
+
+        self.assertEqual((results['failure'], results['timeout']), (latency.failures, latency.timeouts))
+        self.assertAlmostEqual(latency.timeouts / 1000, 0.1, delta=0.03)
+        self.assertAlmostEqual(latency.failures / 900, 0.2, delta=0.04)
+        self.assertEqual(sum(sleeps), results['ok'] + results['failure'] + 3 * results['timeout'])
+
+    def test_function(self):
+        sleeps = []
+        fun = Function(Rastrigin, rng=0)
+        fun.setLatency(Latency(scale=0.1, sleep=sleeps.append))
+
+        self.assertEqual(fun([1, 1]), fun.benchmark.fun(np.array([1, 1])))
+        fun.callMany([[0, 0], [2, 2]])
+        self.assertEqual((fun.evaluation, len(sleeps)), (3, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
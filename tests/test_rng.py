@@ -0,0 +1,25 @@
+import unittest
+
+import numpy as np
+
+from src.optimization import rng
+
+
+class Test_rng(unittest.TestCase):
+    def test_spawn(self):
+        streams = [g.random(3).tolist() for g in rng.spawn(7, 3)]
+
+        self.assertEqual(streams, [g.random(3).tolist() for g in rng.spawn(7, 3)])
+        self.assertEqual(len({tuple(s) for s in streams}), 3)
+        self.assertEqual(len(rng.spawn(np.random.default_rng(7), 2)), 2)
+
+    def test_state(self):
+        generator = rng.generator(np.random.Generator(np.random.Philox(5)))
+        generator.random(4)
+        restored = rng.fromState(rng.getState(generator))
+
+        self.assertEqual(restored.random(5).tolist(), generator.random(5).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from libs.go_benchmark_functions import Rastrigin, Stochastic
+from src.optimization.space import Function, registry, libraryKey
+
+
+class Test_Function(unittest.TestCase):
+    def test_evaluateMany(self):
+        for benchmark, vectorized in [(Rastrigin, True), (Stochastic, False)]:
+            fun = Function(benchmark, rng=0)
+            vectors = np.random.default_rng(1).uniform(-5, 5, (50, 2))
+
+            self.assertEqual(fun.vectorized, vectorized)
+            values = fun.evaluateMany(vectors)
+            self.assertEqual(values.shape, (50,))
+            if vectorized:
+                np.testing.assert_allclose(values, [fun.evaluate(v) for v in vectors])
+            self.assertEqual(fun.evaluation, 0)
+
+    def test_callMany(self):
+        fun = Function(Rastrigin, rng=0)
+        self.assertEqual(fun.callMany([[0, 0], [1, 1], [2, 2]]).tolist(), [fun.evaluate([x, x]) for x in range(3)])
+        self.assertEqual(fun.evaluation, 3)
+
+    def test_listener(self):
+        fun = Function(Rastrigin, rng=0)
+        calls = []
+        fun.setListener(lambda seq, value: calls.append((seq, value)))
+        fun([1, 1])
+        fun.callMany([[2, 2], [3, 3]])
+        fun.evaluate([4, 4])  # Not counted, not reported
+
+        self.assertEqual(calls, [(x, fun.evaluate([x, x])) for x in [1, 2, 3]])
+
+    def test_cache(self):
+        fun = Function(Rastrigin, rng=0)
+        fun.setCache(2)
+
+        self.assertEqual(fun([1, 1]), fun.evaluate([1, 1]))
+        fun([1, 1])
+        fun([2, 2])
+        fun([3, 3])  # Evicts [1, 1]
+        fun([1, 1])
+        self.assertEqual(fun.evaluation, 4)
+        self.assertEqual((fun.cache.hits, fun.cache.misses, len(fun.cache)), (1, 4, 2))
+
+        values = fun.callMany([[3, 3], [4, 4], [4, 4], [1, 1]])
+        self.assertEqual(values.tolist(), [fun.evaluate([x, x]) for x in [3, 4, 4, 1]])
+        self.assertEqual(fun.evaluation, 5)
+        self.assertEqual(fun.cache.stats()['hits'], 4)
+
+
+class Test_registry(unittest.TestCase):
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as cacheDir:
+            built = registry(cacheDir)
+            cached = registry(cacheDir)
+            with open(os.path.join(cacheDir, 'registry.json')) as f:
+                self.assertEqual(json.load(f)['key'], libraryKey())
+
+        self.assertEqual([info.__dict__ for info in cached], [info.__dict__ for info in built])
+        info = next(info for info in cached if info.name == 'Rastrigin')
+        fun = info.load()
+        self.assertEqual((fun.name, fun.dimensions, fun.minValue), (info.name, info.dimensions, info.fglob))
+        self.assertEqual([list(bound) for bound in fun.benchmark.bounds], info.bounds)
+
+
+if __name__ == '__main__':
+    unittest.main()
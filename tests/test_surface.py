@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from libs.go_benchmark_functions import Rastrigin
+from src.optimization import surface
+from src.optimization.space import Function
+from src.optimization.surface import SurfaceCache
+
+
+class Test_surface(unittest.TestCase):
+    def test_zoomBounds(self):
+        fun = Function(Rastrigin, rng=0)
+        fun.bounds = [[-5, 5], [-5, 5]]
+
+        self.assertEqual(surface.zoomBounds(fun), [[-5, 5], [-5, 5]])
+        self.assertEqual(surface.zoomBounds(fun, [4, 0], zoom=10), [[3, 5], [-1, 1]])
+
+    def test_sample(self):
+        fun = Function(Rastrigin, rng=0)
+        values = surface.sample(fun, [[0, 1], [2, 4]], 3)
+
+        self.assertEqual(values.shape, (3, 3))
+        self.assertEqual(values[2, 1], fun.evaluate([0.5, 4]))
+        self.assertEqual(fun.evaluation, 9)
+
+
+class Test_SurfaceCache(unittest.TestCase):
+    def test_sample(self):
+        fun = Function(Rastrigin, rng=0)
+        with tempfile.TemporaryDirectory() as cacheDir:
+            cache = SurfaceCache(cacheDir)
+            values = cache.sample(fun, [[0, 1], [2, 4]], 5)
+            cached = cache.sample(fun, [[0, 1], [2, 4]], 5)
+            cache.sample(fun, [[0, 1], [2, 4]], 6)
+
+            self.assertIsInstance(cached, np.memmap)
+            np.testing.assert_array_equal(cached, values)
+            self.assertEqual((cache.hits, cache.misses, fun.evaluation), (1, 2, 61))
+            self.assertEqual(len(os.listdir(cacheDir)), 2)
+            del cached
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from libs.go_benchmark_functions import Rastrigin
+from src.optimization.space import Function
+from src.optimization.trace import TraceLog
+
+
+class Test_TraceLog(unittest.TestCase):
+    def test_appendRead(self):
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, 'run.trace')
+            trace = TraceLog(path, 3, capacity=2)
+            for i in range(5):
+                trace.append(i, [i, i + 1, i + 2], i * 10., 'init')
+            trace.extend([5, 6], [[0, 0, 0], [1, 1, 1]], [50., 60.], 'search')
+            self.assertEqual(trace.capacity, 8)
+
+            # Records are readable before close
+            self.assertEqual(len(TraceLog.read(path)), 7)
+            trace.close()
+            self.assertEqual(os.path.getsize(path), TraceLog.HEADER + 7 * trace.dtype.itemsize)
+
+            records = TraceLog.read(path)
+            self.assertIsInstance(records, np.memmap)
+            self.assertEqual(records['seq'].tolist(), list(range(7)))
+            self.assertEqual(records['vector'][4].tolist(), [4, 5, 6])
+            self.assertEqual(records['value'].tolist(), [0, 10, 20, 30, 40, 50, 60])
+            self.assertEqual(records['phase'].tolist(), [b'init'] * 5 + [b'search'] * 2)
+            self.assertTrue(np.all(np.diff(records['time']) >= 0))
+            del records
+
+    def test_function(self):
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, 'run.trace')
+            fun = Function(Rastrigin, rng=0)
+            fun.setTrace(TraceLog(path, 2))
+            fun([1, 1])
+            fun.phase = 'batch'
+            fun.callMany([[2, 2], [3, 3]])
+            fun.evaluate([4, 4])  # Not counted, not traced
+            fun.trace.close()
+
+            records = TraceLog.read(path)
+            self.assertEqual(records['seq'].tolist(), [1, 2, 3])
+            self.assertEqual(records['value'].tolist(), [fun.evaluate([x, x]) for x in [1, 2, 3]])
+            self.assertEqual(records['phase'].tolist(), [b'', b'batch', b'batch'])
+            del records
+
+    def test_open(self):
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, 'run.trace')
+            trace = TraceLog(path, 2)
+            for i in range(1, 6):
+                trace.append(i, [i, i], i * 10.)
+            trace.close()
+
+            # Evaluations after 3rd are cut as they would be evaluated again after resume
+            trace = TraceLog.open(path, maxSeq=3)
+            self.assertEqual((trace.dim, trace.count), (2, 3))
+            trace.append(4, [0, 0], 0.)
+            trace.close()
+
+            records = TraceLog.read(path)
+            self.assertEqual(records['seq'].tolist(), [1, 2, 3, 4])
+            self.assertEqual(records['value'].tolist(), [10, 20, 30, 0])
+            del records
+
+
+if __name__ == '__main__':
+    unittest.main()
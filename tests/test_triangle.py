@@ -1,7 +1,12 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import Mock, MagicMock
 
-from src.optimization.triangle import Point, Line, Triangle, TriangleOptimizer
+from src.optimization.mesh import TriangleMesh, TriangleGrid
+from src.optimization.space import functions
+from src.optimization.store import TriangleStore
+from src.optimization.triangle import Point, Line, Triangle, TriangleOptimizer, PointGrid
 
 
 class Test_Point(unittest.TestCase):
@@ -34,8 +39,8 @@ class Test_Line(unittest.TestCase):
         self.assertEqual(self.line2.size(onSurface=False), 3 ** .5)
 
     def test_center(self):
-        self.assertEqual(self.line2.center(onSurface=False), [.5, .5, .5])
-        self.assertEqual(self.line2.center(onSurface=True), [.5, .5])
+        self.assertEqual(self.line2.center(onSurface=False).tolist(), [.5, .5, .5])
+        self.assertEqual(self.line2.center(onSurface=True).tolist(), [.5, .5])
 
     def test_mutualPoint(self):
         fakeOrigin = Point(0, 0, 0)
@@ -48,7 +53,7 @@ class Test_Line(unittest.TestCase):
         fakeOrigin2 = Point(.5, 0, 1)
         self.assertTrue(self.line1.isOnLine(self.origin, onSurface=False))
         self.assertFalse(self.line1.isOnLine(fakeOrigin, onSurface=False))
-        self.assertTrue(self.line1.isOnLine(fakeOrigin1, onSurface=False))
+        self.assertFalse(self.line1.isOnLine(fakeOrigin1, onSurface=False))  # Points are on line only exactly
         self.assertFalse(self.line1.isOnLine(fakeOrigin2, onSurface=False))
         self.assertTrue(self.line1.isOnLine(fakeOrigin2, onSurface=True))
 
@@ -84,11 +89,11 @@ class Test_Triangle(unittest.TestCase):
 
         for i, p in enumerate(self.p):
             if i == 0:
-                self.assertEqual(p.triangles, [self.tri1, self.tri2, self.tri3])
+                self.assertEqual(list(p.triangles), [self.tri1, self.tri2, self.tri3])
             elif i == 1:
-                self.assertEqual(p.triangles, [self.tri1, self.tri2])
+                self.assertEqual(list(p.triangles), [self.tri1, self.tri2])
             else:
-                self.assertEqual(p.triangles, [self.tri1])
+                self.assertEqual(list(p.triangles), [self.tri1])
 
     def test_meanValue(self):
         self.assertEqual(self.tri3.meanValue(), 4)
@@ -123,9 +128,9 @@ class Test_Triangle(unittest.TestCase):
         tri1 = Triangle(lines1)
         tri2 = Triangle(lines2)
 
-        self.assertEqual(tri.coincidingTriangles(onSurface=True), [tri1])
-        self.assertEqual(tri1.coincidingTriangles(onSurface=True), [tri])
-        self.assertEqual(tri2.coincidingTriangles(onSurface=True), [])
+        self.assertEqual(tri.coincidingTriangles(onSurface=True, searchSpace=None, simple=True), [tri1])
+        self.assertEqual(tri1.coincidingTriangles(onSurface=True, searchSpace=None, simple=True), [tri])
+        self.assertEqual(tri2.coincidingTriangles(onSurface=True, searchSpace=None, simple=True), [])
 
     def test_connectedTriangle_2(self):
         p = [Point(0, 0, 0), Point(1, 0, 0), Point(0, 1, 0)]
@@ -136,54 +141,136 @@ class Test_Triangle(unittest.TestCase):
         tri = Triangle(lines)
         tri1 = Triangle(lines1)
 
-        self.assertEqual(tri.coincidingTriangles(onSurface=True), [tri1])
-        self.assertEqual(tri1.coincidingTriangles(onSurface=True), [tri])
+        self.assertEqual(tri.coincidingTriangles(onSurface=True, searchSpace=None, simple=True), [tri1])
+        self.assertEqual(tri1.coincidingTriangles(onSurface=True, searchSpace=None, simple=True), [tri])
+
+class Test_PointGrid(unittest.TestCase):
+    def test_isNear(self):
+        grid = PointGrid(0.5)
+        grid.add(Point(0.1, 0.1, 0))
+        self.assertTrue(grid.isNear(Point(-0.2, 0.3, 0)))
+        self.assertTrue(grid.isNear(Point(0.55, 0.1, 0)))
+        self.assertFalse(grid.isNear(Point(0.6, 0.1, 0)))
+        self.assertFalse(grid.isNear(Point(0.5, 0.5, 0)))
+
+
+class Test_TriangleMesh(unittest.TestCase):
+    def test_splitedEdge(self):
+        a, b, c, d, m = Point(0, 0, 0), Point(1, 0, 0), Point(1, 1, 0), Point(0, 1, 0), Point(.5, .5, 0)
+        diagonal = Line(c, a)
+        tri1 = Triangle([Line(a, b), Line(b, c), diagonal])
+        tri2 = Triangle([diagonal, Line(c, d), Line(d, a)])
+        mesh = TriangleMesh()
+        mesh.add(tri1)
+        mesh.add(tri2)
+        self.assertEqual(mesh.across(tri1, diagonal), [tri2])
+
+        # Split first triangle on diagonal, second triangle gets hanging point on its side
+        mesh.remove(tri1)
+        for p in tri1.points:
+            del p.triangles[tri1]
+        mesh.split(c, a, m)
+        median = Line(b, m)
+        half1 = Triangle([Line(m, a), tri1.lines[0], median])
+        half2 = Triangle([median, Line(m, c), tri1.lines[1]])
+        mesh.add(half1)
+        mesh.add(half2)
+
+        self.assertEqual(set(mesh.across(tri2, diagonal)), {half1, half2})
+        self.assertEqual(mesh.across(half1, half1.lines[0]), [tri2])
+        self.assertEqual(mesh.across(half1, median), [half2])
+        self.assertEqual(set(mesh.coincidingTriangles(tri2)), {half1, half2})
+
+
+class Test_TriangleGrid(unittest.TestCase):
+    def test_locate(self):
+        a, b, c, d = Point(0, 0, 0), Point(4, 0, 0), Point(4, 4, 0), Point(0, 4, 0)
+        e, f = Point(.5, 0, 0), Point(0, .5, 0)
+        small = Triangle([Line(a, e), Line(e, f), Line(f, a)])
+        big = Triangle([Line(b, c), Line(c, d), Line(d, b)])
+        grid = TriangleGrid()
+        grid.add(small)
+        grid.add(big)
+
+        self.assertEqual(grid.locate([.1, .1]), small)
+        self.assertEqual(grid.locate([3, 3]), big)
+        self.assertEqual(grid.locate([3, 3], exclude=[big]), None)
+        self.assertEqual(grid.locate([1, 1]), None)
+        grid.remove(big)
+        self.assertEqual(grid.locate([3, 3]), None)
+        self.assertEqual(len(grid.levels), 1)
+
+
+class Test_TriangleStore(unittest.TestCase):
+    def test_bestRanked(self):
+        store = TriangleStore()
+        store.add('a', evalDiff=1, meanValue=1, eval=0)
+        store.add('b', evalDiff=1, meanValue=1, eval=0)
+        self.assertEqual(store.bestRanked(maxEval=10), 'b')  # Zero eval norm gives nan ranks, last is picked
+
+        store.add('c', evalDiff=2, meanValue=-1, eval=1)
+        store.add('d', evalDiff=5, meanValue=-5, eval=20)
+        self.assertEqual(store.bestRanked(maxEval=10), 'c')
+        store.remove('c')
+        self.assertEqual(store.bestRanked(maxEval=10), 'b')
+        self.assertEqual(store.bestRanked(maxEval=20), 'b')
+        store.remove('a')
+        store.remove('b')
+        self.assertEqual(store.bestRanked(maxEval=10), 'd')
+
+
+class Test_TriangleOptimizerSeed(unittest.TestCase):
+    def test_saveLoad(self):
+        fun = [f for f in functions(rng=0) if f.name == 'Trefethen'][0]
+        opt = TriangleOptimizer(fun, 500, rng=1)
+        vectors = [opt.nextPoint().tolist() for i in range(150)]
+
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, 'triangle.npz')
+            opt.save(path)
+            loaded = TriangleOptimizer.load(path, fun)
+
+        self.assertEqual([loaded.nextPoint().tolist() for i in range(50)], [opt.nextPoint().tolist() for i in range(50)])
+
+        # Same seed replays same run
+        replay = TriangleOptimizer(fun, 500, rng=1)
+        self.assertEqual([replay.nextPoint().tolist() for i in range(150)], vectors)
+
 
 class Test_TriangleOptimizer(unittest.TestCase):
     def setUp(self):
-
-        self.drawMock = Mock()
         self.spaceMock = Mock(return_value=3)
-        self.spaceMock.bounds=[[0,1],[0,1]]
+        self.spaceMock.bounds = [[0, 1], [0, 1]]
 
-        self.to = TriangleOptimizer(self.spaceMock, self.drawMock, 100)
-        self.to.drawTriangles = Mock()
-        self.to.drawConnectedTriangles = Mock()
+        self.to = TriangleOptimizer(self.spaceMock, 100)
 
     def test_partition(self):
-        self.assertEqual(self.to.triangles[0].volume(), 0.5)
-        self.assertEqual(self.to.triangles[1].volume(), 0.5)
-
+        triangles = list(self.to.triangles)
+        self.assertEqual([t.volume() for t in triangles], [0.5, 0.5])
 
         #==================================================
-        self.to.partition(self.to.triangles[0])
+        self.to.partition(triangles[0])
 
-        self.assertEqual(len(self.to.triangles), 4)
-        cnTri = self.to.triangles[0].coincidingTriangles(onSurface=True)
-        self.assertEqual(len(cnTri), 3)
-        self.assertEqual(set(cnTri), set(self.to.triangles[1:]))
+        triangles = list(self.to.triangles)
+        self.assertEqual(len(triangles), 3)
+        cnTri = triangles[0].coincidingTriangles(onSurface=True, searchSpace=None, simple=True)
+        self.assertEqual(set(cnTri), set(triangles[1:]))
+        self.assertEqual(self.to.mesh.coincidingTriangles(triangles[0]), [t for t in triangles if t in cnTri])
         #==================================================
 
-
-        self.assertEqual(self.to.triangles[0].volume(), 0.5)
-        self.assertEqual(self.to.triangles[1].volume(), 0.25)
-        self.assertEqual(self.to.triangles[2].volume(), 0.25)
-
+        self.assertEqual([t.volume() for t in triangles], [0.5, 0.25, 0.25])
 
         #==================================================
-        self.to.partition(self.to.triangles[1])
+        self.to.partition(triangles[1])
 
-        self.assertEqual(len(self.to.triangles), 4)
-        cnTri = self.to.triangles[-1].coincidingTriangles(onSurface=True)
-        self.assertEqual(len(cnTri), 2)
-        self.assertEqual(set(cnTri), set(self.to.triangles[1:3]))
+        triangles = list(self.to.triangles)
+        self.assertEqual(len(triangles), 4)
+        cnTri = triangles[0].coincidingTriangles(onSurface=True, searchSpace=None, simple=True)
+        self.assertEqual(set(cnTri), set(triangles[1:3]))
+        self.assertEqual(self.to.mesh.coincidingTriangles(triangles[0]), [t for t in triangles if t in cnTri])
         #==================================================
 
-
-        self.assertEqual(self.to.triangles[0].volume(), 0.5)
-        self.assertEqual(self.to.triangles[1].volume(), 0.25)
-        self.assertEqual(self.to.triangles[2].volume(), 0.125)
-        self.assertEqual(self.to.triangles[2].volume(), 0.125)
+        self.assertEqual([t.volume() for t in triangles], [0.5, 0.25, 0.125, 0.125])
 
 
 if __name__ == '__main__':